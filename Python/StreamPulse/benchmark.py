@@ -0,0 +1,299 @@
+# Import argparse to read the benchmark options from the command line
+import argparse
+# Import json to write the machine-readable report
+import json
+# Import os for file paths
+import os
+# Import platform to describe the host in the report
+import platform
+# Import re to read the frame count from FFmpeg output
+import re
+# Import subprocess to spawn the FFmpeg encoders
+import subprocess
+# Import sys for the Python version and exit codes
+import sys
+# Import tempfile for the generated input clips
+import tempfile
+# Import threading to run one feeder per stream
+import threading
+# Import time for timing measurements
+import time
+# Import psutil to sample encoder CPU and memory
+import psutil
+# Import the StreamPulse pipeline (command builders, frame transport, pacer and synthetic source)
+import streampulse as sp
+
+# Default resolutions to benchmark
+DEFAULT_RESOLUTIONS = "640x360,1280x720,1920x1080"
+# Default frame rates to benchmark
+DEFAULT_FPS = "15,30,60"
+# Interval between CPU/RSS samples in seconds
+SAMPLE_INTERVAL = 0.5
+
+# Parse a comma-separated list of WIDTHxHEIGHT values
+def parse_resolutions(text):
+    # Split each entry into integer width and height
+    return [tuple(int(v) for v in item.lower().split("x")) for item in text.split(",") if item]
+
+# Return the given percentile of a list of values
+def percentile(values, pct):
+    # Return None for an empty list
+    if not values:
+        return None
+    # Sort the values
+    ordered = sorted(values)
+    # Pick the value at the percentile rank
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+# Sample CPU and RSS of a process until it exits or the stop event is set
+def sample_process(pid, stop_event, samples):
+    # Attach to the process
+    try:
+        proc = psutil.Process(pid)
+        # Prime the CPU counter
+        proc.cpu_percent(None)
+    # Give up if the process is already gone
+    except psutil.Error:
+        return
+    # Sample until stopped
+    while not stop_event.wait(SAMPLE_INTERVAL):
+        # Record CPU percent (of one core), RSS in bytes and the thread count
+        try:
+            samples.append((proc.cpu_percent(None), proc.memory_info().rss, proc.num_threads()))
+        # Stop when the process exits
+        except psutil.Error:
+            break
+
+# Summarize CPU/RSS samples
+def summarize_samples(samples):
+    # Return empty values without samples
+    if not samples:
+        return {"cpu_percent": None, "rss_mb": None, "rss_peak_mb": None, "threads_peak": None}
+    # Average CPU and RSS, plus the RSS and thread count peaks
+    return {
+        "cpu_percent": round(sum(s[0] for s in samples) / len(samples), 1),
+        "rss_mb": round(sum(s[1] for s in samples) / len(samples) / 1e6, 1),
+        "rss_peak_mb": round(max(s[1] for s in samples) / 1e6, 1),
+        "threads_peak": max(s[2] for s in samples)
+    }
+
+# Feed synthetic frames into one window-pipeline encoder and record the results
+def run_window_stream(stream_key, width, height, fps, duration, paced, preconvert, result):
+    # Build the test pattern frames
+    frames = sp.SyntheticBackend((width, height)).pattern(None)
+    # Build the same command monitor_and_stream uses
+    cmd = sp.build_window_ffmpeg_cmd(stream_key, width, height, 0, 0, fps, preconvert)
+    # Start the encoder under the process supervisor, like the encoder pool does
+    process = sp.SUPERVISOR.spawn(cmd, feed=True)
+    # Start sampling the encoder
+    samples = []
+    stop_event = threading.Event()
+    sampler = threading.Thread(target=sample_process, args=(process.pid, stop_event, samples), daemon=True)
+    sampler.start()
+    # Create the transport and pacer used by feed_frames
+    transport = sp.FrameTransport(process.stdin)
+    pacer = sp.FramePacer(fps)
+    # Create the pre-pipe converter when converting before FFmpeg
+    converter = sp.FrameConverter(width, height, 0, 0) if preconvert else None
+    # Per-frame write latencies in seconds
+    latencies = []
+    # Record the start time
+    start = time.monotonic()
+    # Feed frames until the duration elapses or the encoder exits
+    try:
+        while time.monotonic() - start < duration and process.poll() is None:
+            # Wait for the next deadline when pacing, otherwise write back-to-back
+            due = pacer.wait() if paced else 1
+            # Write the frame once per due slot
+            for _ in range(due):
+                # Time the conversion and the write
+                t0 = time.perf_counter()
+                frame = frames[transport.frames_written % len(frames)]
+                transport.write(converter.convert(frame) if converter else frame)
+                latencies.append(time.perf_counter() - t0)
+    # A broken pipe means the encoder died
+    except OSError as e:
+        result["error"] = str(e)
+    # Measure the elapsed time
+    elapsed = time.monotonic() - start
+    # Close the pipe and wait for the encoder to finish
+    try:
+        process.stdin.close()
+    except OSError:
+        pass
+    process.wait()
+    # Stop sampling
+    stop_event.set()
+    sampler.join()
+    # Record the results
+    result.update({
+        "stream": stream_key,
+        "frames": transport.frames_written,
+        "fps_delivered": round(transport.frames_written / elapsed, 2),
+        "pipe_mb_s": round(transport.bytes_written / elapsed / 1e6, 2),
+        "write_ms_p50": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "write_ms_p95": round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        "write_ms_p99": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        "write_ms_max": round(max(latencies) * 1000, 3) if latencies else None,
+        "late_frames": pacer.late_frames if paced else None,
+        "dropped_frames": pacer.dropped if paced else None,
+        "exit_code": process.returncode
+    }, **summarize_samples(samples))
+
+# Encode a synthetic clip to use as the input of the YouTube pipeline
+def generate_clip(path, width, height, fps, duration):
+    # Encode raw test pattern frames to H.264, like a YouTube rendition
+    cmd = [
+        sp.FFMPEG_PATH, "-y", "-loglevel", "error", "-f", "rawvideo", "-pixel_format", "rgb24",
+        "-video_size", f"{width}x{height}", "-framerate", str(fps), "-i", "pipe:0",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path
+    ]
+    # Start the encoder
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, creationflags=sp.CREATE_NO_WINDOW)
+    # Write the frames for the whole clip
+    frames = sp.SyntheticBackend((width, height)).pattern(None)
+    transport = sp.FrameTransport(process.stdin.raw)
+    for i in range(int(duration * fps)):
+        transport.write(frames[i % len(frames)])
+    # Finish the clip
+    process.stdin.close()
+    process.wait()
+
+# Run one YouTube-pipeline relay on a local clip and record the results
+def run_youtube_stream(stream_key, clip, fps, remux, result):
+    # Build the same command start_youtube_stream uses
+    cmd = sp.build_youtube_ffmpeg_cmd(stream_key, clip, 0, 0, fps, remux)
+    # Record the start time
+    start = time.monotonic()
+    # Start the relay under the process supervisor and collect its progress output
+    process = sp.SUPERVISOR.spawn(cmd)
+    lines = []
+    process.listen(on_stdout=lines.append)
+    # Start sampling the relay
+    samples = []
+    stop_event = threading.Event()
+    sampler = threading.Thread(target=sample_process, args=(process.pid, stop_event, samples), daemon=True)
+    sampler.start()
+    # Wait for the relay to exit
+    process.wait()
+    output = "".join(lines)
+    # Measure the elapsed time
+    elapsed = time.monotonic() - start
+    # Stop sampling
+    stop_event.set()
+    sampler.join()
+    # Read the last reported frame count
+    counts = re.findall(r"frame=\s*(\d+)", output)
+    frames = int(counts[-1]) if counts else 0
+    # Record the results
+    result.update({
+        "stream": stream_key,
+        "frames": frames,
+        "fps_delivered": round(frames / elapsed, 2),
+        "pipe_mb_s": None,
+        "write_ms_p50": None,
+        "write_ms_p95": None,
+        "write_ms_p99": None,
+        "write_ms_max": None,
+        "late_frames": None,
+        "dropped_frames": None,
+        "exit_code": process.returncode
+    }, **summarize_samples(samples))
+
+# Run one benchmark case with several concurrent streams
+def run_case(pipeline, width, height, fps, streams, duration, paced, preconvert, remux, sink, workdir):
+    # Log the case
+    print(f"{pipeline} {width}x{height}@{fps} x{streams} ...", flush=True)
+    # Prepare one result dictionary per stream
+    results = [{} for _ in range(streams)]
+    # Register the benchmark streams so their output goes to the chosen sink
+    keys = [f"bench_{pipeline}_{i}" for i in range(streams)]
+    for key in keys:
+        sp.STREAMS[key] = {"type": pipeline, "sink": sink}
+    # Generate the input clip for the YouTube pipeline
+    if pipeline == "youtube":
+        clip = os.path.join(workdir, f"clip_{width}x{height}_{fps}.mp4")
+        if not os.path.exists(clip):
+            generate_clip(clip, width, height, fps, duration)
+        threads = [threading.Thread(target=run_youtube_stream, args=(key, clip, fps, remux, result)) for key, result in zip(keys, results)]
+    # Otherwise feed synthetic frames into the window pipeline
+    else:
+        threads = [threading.Thread(target=run_window_stream, args=(key, width, height, fps, duration, paced, preconvert, result)) for key, result in zip(keys, results)]
+    # Sample the benchmark process itself (frame feeders)
+    samples = []
+    stop_event = threading.Event()
+    sampler = threading.Thread(target=sample_process, args=(os.getpid(), stop_event, samples), daemon=True)
+    sampler.start()
+    # Run all streams concurrently
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Stop sampling the benchmark process
+    stop_event.set()
+    sampler.join()
+    # Remove the benchmark streams
+    for key in keys:
+        del sp.STREAMS[key]
+    # Return the case report
+    return {
+        "pipeline": pipeline, "width": width, "height": height, "fps": fps,
+        "streams": streams, "duration": duration, "paced": paced, "preconvert": preconvert, "remux": remux,
+        "feeder": summarize_samples(samples),
+        "results": results
+    }
+
+# Run the benchmark suite
+def main():
+    # Define the command line options
+    parser = argparse.ArgumentParser(description="Benchmark the StreamPulse encode pipeline")
+    parser.add_argument("--pipeline", default="window", help="Comma-separated pipelines to run: window, youtube")
+    parser.add_argument("--resolutions", default=DEFAULT_RESOLUTIONS, help="Comma-separated WIDTHxHEIGHT list")
+    parser.add_argument("--fps", default=DEFAULT_FPS, help="Comma-separated frame rates")
+    parser.add_argument("--streams", type=int, default=1, help="Concurrent streams per case")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per case")
+    parser.add_argument("--unpaced", action="store_true", help="Write frames back-to-back to find the throughput ceiling")
+    parser.add_argument("--preconvert", action="store_true", help="Convert frames to yuv420p before the pipe (window pipeline)")
+    parser.add_argument("--remux", action="store_true", help="Relay with stream copy instead of transcoding (youtube pipeline)")
+    parser.add_argument("--sink", default="null", help="Output sink: null, rtsp or a file path")
+    parser.add_argument("--output", default="benchmark_report.json", help="Path of the JSON report")
+    args = parser.parse_args()
+    # Import the capture modules the frame sources and converters use (StreamPulse loads them with the first window stream)
+    sp.load_capture_modules()
+    # Collect the case reports
+    cases = []
+    # Use a temporary directory for generated clips
+    with tempfile.TemporaryDirectory() as workdir:
+        # Run every combination of pipeline, resolution and frame rate
+        for pipeline in args.pipeline.split(","):
+            for width, height in parse_resolutions(args.resolutions):
+                for fps in (int(v) for v in args.fps.split(",")):
+                    cases.append(run_case(pipeline, width, height, fps, args.streams, args.duration, not args.unpaced, args.preconvert, args.remux, args.sink, workdir))
+    # Build the report
+    report = {
+        "version": sp.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {
+            "platform": platform.platform(),
+            "python": sys.version.split()[0],
+            "cpu_count": psutil.cpu_count(),
+            "memory_mb": round(psutil.virtual_memory().total / 1e6)
+        },
+        "ffmpeg": sp.FFMPEG_PATH,
+        "cases": cases
+    }
+    # Write the report
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    # Print a summary line per stream
+    for case in cases:
+        for result in case["results"]:
+            print(f"{case['pipeline']:8} {case['width']}x{case['height']}@{case['fps']:<3} {result['stream']:18} "
+                  f"{result['fps_delivered']:>7} fps  {result['pipe_mb_s'] or 0:>8} MB/s  "
+                  f"p95 {result['write_ms_p95'] or 0:>7} ms  cpu {result['cpu_percent'] or 0:>6}%  rss {result['rss_mb'] or 0:>7} MB")
+    # Report where the results went
+    print(f"Report written to {args.output}")
+
+# Main entry point of the benchmark
+if __name__ == "__main__":
+    main()
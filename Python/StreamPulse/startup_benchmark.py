@@ -0,0 +1,170 @@
+# Import argparse to read the benchmark options from the command line
+import argparse
+# Import json to write the machine-readable report and the headless config
+import json
+# Import os for file paths and the child environment
+import os
+# Import platform to describe the host in the report
+import platform
+# Import socket to pick a free port for the headless control API
+import socket
+# Import subprocess to start each cold start in a fresh interpreter
+import subprocess
+# Import sys for the interpreter path
+import sys
+# Import tempfile for the headless config file
+import tempfile
+# Import time for timing measurements
+import time
+# Import urllib to poll the headless control API
+import urllib.request
+
+# Directory of streampulse.py
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Modules that only window capture needs, reported when a cold start loaded them anyway
+CAPTURE_MODULES = ["numpy", "cv2", "dxcam", "pygetwindow", "screeninfo", "multiprocessing.shared_memory"]
+# Seconds to wait for one cold start before giving up
+START_TIMEOUT = 30
+
+# Child script: import StreamPulse and report the import time and the capture modules it loaded
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import streampulse
+elapsed = time.perf_counter() - started
+print(json.dumps({"import_ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+# Child script: create the GUI window, process its first events and report when it is shown
+GUI_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import streampulse
+imported = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+window = streampulse.streampulseWindow()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "window_ms": (shown - imported) * 1000, "loaded": [m for m in %r if m in sys.modules]}), flush=True)
+window.close()
+"""
+
+# Return the median of a list of values
+def median(values):
+    # Sort the values
+    ordered = sorted(values)
+    # Pick the middle value (or the mean of the two middle values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+# Summarize the wall times of the runs of one mode in milliseconds
+def summarize(runs, field):
+    # Collect the values of the runs that reported them
+    values = [run[field] for run in runs if run.get(field) is not None]
+    # Return the minimum, median and maximum
+    if not values:
+        return {}
+    return {f"{field}_min": round(min(values), 1), f"{field}_median": round(median(values), 1), f"{field}_max": round(max(values), 1)}
+
+# Run a child script in a fresh interpreter and return its report with the wall time from spawn to exit
+def run_script(script, env):
+    # Start the interpreter with the app directory on the path
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", script % (CAPTURE_MODULES,)], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, timeout=START_TIMEOUT)
+    wall = time.perf_counter() - started
+    # Fail with the child's error output
+    if output.returncode != 0:
+        raise RuntimeError(f"Cold start failed: {output.stderr.strip()}")
+    # Return the last output line (StreamPulse may log to stdout first) with the wall time
+    report = json.loads(output.stdout.strip().splitlines()[-1])
+    report["wall_ms"] = wall * 1000
+    return report
+
+# Start the headless daemon and return the time from spawn until its control API answers
+def run_headless(env, workdir):
+    # Write a YouTube-only config without autostart, so nothing but the daemon itself starts
+    config = os.path.join(workdir, "streams.json")
+    with open(config, "w") as f:
+        json.dump({"streams": {"news": {"type": "youtube", "url": "https://www.youtube.com/watch?v=startup"}}}, f)
+    # Pick a free port for the control API
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    # Start the daemon
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(APP_DIR, "streampulse.py"), "--headless", config, "--port", str(port)],
+                               cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        # Poll the API until it answers
+        while time.perf_counter() - started < START_TIMEOUT:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/streams", timeout=1).read()
+                return {"ready_ms": (time.perf_counter() - started) * 1000}
+            # Not listening yet
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Headless daemon exited with code {process.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError("Headless daemon did not answer in time")
+    # Stop the daemon
+    finally:
+        process.terminate()
+        process.wait()
+
+# Run the benchmark
+def main():
+    # Define the command line options
+    parser = argparse.ArgumentParser(description="Benchmark the cold start of StreamPulse")
+    parser.add_argument("--modes", default="import,headless,gui", help="Comma-separated modes to run: import, headless, gui")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per mode")
+    parser.add_argument("--qt-platform", default=None, help="QT_QPA_PLATFORM for the GUI runs (e.g. offscreen without a display)")
+    parser.add_argument("--output", default="startup_report.json", help="Path of the JSON report")
+    args = parser.parse_args()
+    # Give the children the same environment, with the optional Qt platform
+    env = dict(os.environ, **({"QT_QPA_PLATFORM": args.qt_platform} if args.qt_platform else {}))
+    # Collect the results per mode
+    modes = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in args.modes.split(","):
+            # Run the cold starts
+            if mode == "import":
+                runs = [run_script(IMPORT_SCRIPT, env) for _ in range(args.runs)]
+                fields = ["wall_ms", "import_ms"]
+            elif mode == "gui":
+                runs = [run_script(GUI_SCRIPT, env) for _ in range(args.runs)]
+                fields = ["wall_ms", "import_ms", "window_ms"]
+            elif mode == "headless":
+                runs = [run_headless(env, workdir) for _ in range(args.runs)]
+                fields = ["ready_ms"]
+            # Reject unknown modes
+            else:
+                parser.error(f"unknown mode '{mode}'")
+            # Summarize the runs
+            summary = {}
+            for field in fields:
+                summary.update(summarize(runs, field))
+            # Report the capture modules loaded by the cold start (there should be none)
+            summary["capture_modules_loaded"] = sorted({module for run in runs for module in run.get("loaded", [])})
+            modes[mode] = dict(summary, runs=runs)
+    # Build the report
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"platform": platform.platform(), "python": sys.version.split()[0]},
+        "modes": modes
+    }
+    # Write the report
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    # Print a summary line per mode
+    for mode, summary in modes.items():
+        medians = "  ".join(f"{key[:-7]} {value} ms" for key, value in summary.items() if key.endswith("_median"))
+        print(f"{mode:9} {medians}  capture modules loaded: {', '.join(summary['capture_modules_loaded']) or 'none'}")
+    # Report where the results went
+    print(f"Report written to {args.output}")
+
+# Main entry point of the benchmark
+if __name__ == "__main__":
+    main()
@@ -6,50 +6,81 @@ import os
 import subprocess
 # Import threading module to run tasks concurrently
 import threading
+# Import multiprocessing for the optional capture worker processes
+import multiprocessing
 # Import psutil module to monitor system processes
 import psutil
 # Import time module for timing and delays
 import time
-# Import pygetwindow for window management on Windows
-import pygetwindow as gw
-# Import win32gui for low-level Windows GUI operations
-import win32gui
+# Import json to parse ffprobe output
+import json
+# Import re to read the expiry from resolved YouTube URLs
+import re
+# Import the HTTP server for the optional metrics endpoint and the headless control API
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+# Import URL helpers to decode control API paths and derive stream keys from YouTube URLs
+from urllib.parse import unquote, urlsplit, parse_qs
+# Import argparse to read the headless mode options
+import argparse
+# Import signal to stop the headless daemon cleanly on SIGTERM
+import signal
+# Import asyncio for the process supervisor that owns the FFmpeg and yt-dlp children
+import asyncio
+# Import ThreadPoolExecutor for the supervisor's bounded pool of blocking workers
+from concurrent.futures import ThreadPoolExecutor
 # Import logging module for logging application events
 import logging
-# Import get_monitors from screeninfo to detect monitor configurations
-from screeninfo import get_monitors
-# Import dxcam for high-performance screen capture
-import dxcam
-# Import OpenCV (cv2) for image processing
-import cv2
-# Import NumPy for numerical operations on image data
-import numpy as np
-# Import PyQt5 widgets for building the GUI
-from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLineEdit, QLabel, QTableWidget, QTableWidgetItem,
-    QHeaderView, QGroupBox, QFormLayout, QSpinBox, QMessageBox, QCheckBox
-)
-# Import PyQt5 core module for Qt constants and timers
-from PyQt5.QtCore import Qt, QTimer
-# Import PyQt5 GUI module for colors and fonts
-from PyQt5.QtGui import QColor, QFont
+# Capture and image modules (numpy, OpenCV, shared memory, and dxcam, pygetwindow and screeninfo on Windows), imported by
+# load_capture_modules when the first window stream starts, so YouTube relays and start-up do not pay for them
+np = None
+cv2 = None
+shared_memory = None
+dxcam = None
+gw = None
+get_monitors = None
+# Import PyQt5 for the GUI (optional: the headless daemon runs without it)
+try:
+    # Import PyQt5 widgets for building the GUI
+    from PyQt5.QtWidgets import (
+        QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+        QPushButton, QLineEdit, QLabel, QTableView,
+        QHeaderView, QGroupBox, QFormLayout, QSpinBox, QMessageBox, QCheckBox
+    )
+    # Import PyQt5 core module for Qt constants, timers, the table model base and signals
+    from PyQt5.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex, pyqtSignal
+    # Import PyQt5 GUI module for colors and fonts
+    from PyQt5.QtGui import QColor, QFont
+except ImportError:
+    # Let the GUI classes be defined; they cannot be created without PyQt5
+    QApplication = None
+    QMainWindow = object
+    QAbstractTableModel = object
+    QModelIndex = None
+    pyqtSignal = lambda *types: None
 # Import traceback module to format exception stack traces
 import traceback
 # Import RotatingFileHandler for log file rotation
 from logging.handlers import RotatingFileHandler
+# Import namedtuple for lightweight monitor descriptions
+from collections import namedtuple, deque
+# Import bisect for interval lookups in the monitor topology
+import bisect
+# Import ctypes to read display metrics on Windows
+import ctypes
 
 # Define the version of the application
 __version__ = "1.5.25"
 
-# Set the base directory for file paths
-BASE_DIR = "[Directory Here]"
+# Set the base directory for file paths (can be overridden from the environment)
+BASE_DIR = os.environ.get("STREAMPULSE_BASE_DIR", "[Directory Here]")
 # Define the RTSP server address and port
 RTSP_SERVER = "localhost:8555"
-# Set the path to FFmpeg executable
-FFMPEG_PATH = os.path.join(BASE_DIR, "ffmpeg", "ffmpeg.exe")
-# Set the path to yt-dlp executable
-YTDLP_PATH = os.path.join(BASE_DIR, "yt-dlp", "yt-dlp.exe")
+# Set the path to FFmpeg executable (can be overridden from the environment)
+FFMPEG_PATH = os.environ.get("STREAMPULSE_FFMPEG", os.path.join(BASE_DIR, "ffmpeg", "ffmpeg.exe"))
+# Set the path to ffprobe executable (can be overridden from the environment)
+FFPROBE_PATH = os.environ.get("STREAMPULSE_FFPROBE", os.path.join(BASE_DIR, "ffmpeg", "ffprobe.exe"))
+# Set the path to yt-dlp executable (can be overridden from the environment)
+YTDLP_PATH = os.environ.get("STREAMPULSE_YTDLP", os.path.join(BASE_DIR, "yt-dlp", "yt-dlp.exe"))
 # Set the path to MediaMTX executable
 MEDIAMTX_PATH = os.path.join(BASE_DIR, "mediamtx", "mediamtx.exe")
 # Define the log file path with a timestamp
@@ -59,15 +90,131 @@ LOG_FILE = os.path.join(BASE_DIR, "logs", f"streampulse_{time.strftime('%Y%m%d_%
 logger = logging.getLogger()
 # Set the logging level to INFO (less verbose than DEBUG)
 logger.setLevel(logging.INFO)
-# Create a rotating file handler with 5MB max size and 2 backups
-handler = RotatingFileHandler(LOG_FILE, maxBytes=5*1024*1024, backupCount=2)
-# Set the log message format with timestamp, level, and message
-handler.setFormatter(logging.Formatter("%(asctime)s - [%(levelname)s] - %(message)s", "%Y-%m-%d %H:%M:%S"))
-# Add the handler to the logger
-logger.addHandler(handler)
+# Only the main process writes the log file (capture workers report to it)
+if multiprocessing.current_process().name == "MainProcess":
+    # Make sure the log directory exists
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+    # Create a rotating file handler with 5MB max size and 2 backups
+    handler = RotatingFileHandler(LOG_FILE, maxBytes=5*1024*1024, backupCount=2)
+    # Set the log message format with timestamp, level, and message
+    handler.setFormatter(logging.Formatter("%(asctime)s - [%(levelname)s] - %(message)s", "%Y-%m-%d %H:%M:%S"))
+    # Add the handler to the logger
+    logger.addHandler(handler)
 
 # Set debug mode to False to reduce logging verbosity
 DEBUG_MODE = False
+# Number of preallocated frame buffers kept per window stream
+FRAME_POOL_SIZE = 3
+# Maximum number of frames written back-to-back to catch up after a stall (beyond this they are dropped)
+PACER_MAX_CATCHUP = 3
+# Default capture backend for window streams ("dxcam", "synthetic" or "file")
+CAPTURE_BACKEND = "dxcam"
+# Default output sink ("rtsp" for MediaMTX, "null" to discard, or a local file path)
+OUTPUT_SINK = "rtsp"
+# Default source size for synthetic and raw-file capture (width, height)
+SOURCE_SIZE = (1280, 720)
+# Horizontal offset applied to window positions to skip the window border
+WINDOW_X_OFFSET = 24
+# Process creation flags that hide console windows (Windows only)
+CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+# Interval between window enumerations of the shared window tracker (seconds)
+WINDOW_POLL_INTERVAL = 0.5
+# Capture backends shared between streams, keyed by backend name and parameters
+CAPTURE_BACKENDS = {}
+# Window trackers shared between streams, keyed by backend
+WINDOW_TRACKERS = {}
+# Monitor topology caches shared between streams, keyed by backend
+MONITOR_TOPOLOGIES = {}
+# Maximum age of the cached monitor topology before it is re-queried anyway (seconds)
+MONITOR_REFRESH_INTERVAL = 30
+# GetSystemMetrics indices describing the display configuration (monitor count and virtual screen)
+DISPLAY_METRICS = (80, 76, 77, 78, 79)
+# Frame grabbers shared by streams capturing the same region, keyed by backend, output and region
+FRAME_GRABBERS = {}
+# Number of grabbers using each backend camera, by camera id (dxcam returns the same camera for every grabber on an output)
+CAMERA_USERS = {}
+# Default capture mode: "region" grabs each window region, "monitor" grabs each monitor once and slices the regions from it
+CAPTURE_MODE = "region"
+# Whether window frames are downscaled and converted to yuv420p before the pipe instead of inside FFmpeg
+PRE_PIPE_CONVERT = False
+# Whether unchanged window frames are skipped instead of encoded at the full frame rate
+SKIP_STATIC_FRAMES = False
+# Sample every Nth row (whole rows are contiguous and cheap to compare) when checking a frame for changes
+STATIC_SAMPLE_STRIDE = 4
+# Largest per-sample difference still treated as unchanged (0 = exact)
+STATIC_DIFF_THRESHOLD = 0
+# Maximum seconds between frames sent for a static window, so new viewers get a picture
+STATIC_KEEPALIVE_INTERVAL = 1.0
+# Keyframe interval in seconds for streams with skipped frames (the frame-count GOP would stretch)
+STATIC_KEYFRAME_INTERVAL = 2
+# Default latency budget in seconds for frames queued between capture and the encoder pipe
+FRAME_QUEUE_LATENCY = 0.2
+# Whether YouTube relays republish compatible sources with stream copy instead of transcoding
+YOUTUBE_REMUX = True
+# Source codecs that can be republished to RTSP without transcoding
+REMUX_CODECS = ("h264",)
+# Seconds to wait for ffprobe before falling back to transcoding
+PROBE_TIMEOUT = 15
+# Video codec yt-dlp should prefer when choosing a YouTube rendition
+YTDLP_PREFERRED_CODEC = "h264"
+# Fields yt-dlp prints for the chosen format, before its URL
+YTDLP_FORMAT_FIELDS = ("format_id", "vcodec", "width", "height", "fps", "tbr")
+# Lifetime in seconds of resolved URLs that carry no expiry
+URL_CACHE_DEFAULT_TTL = 300
+# Seconds before expiry at which resolved URLs are refreshed in the background
+URL_CACHE_REFRESH_MARGIN = 600
+# A relay that fails within this many seconds is treated as a bad URL and re-resolved
+URL_FAILURE_WINDOW = 10
+# Number of standby encoders kept per window stream, one per recently used geometry
+ENCODER_POOL_SIZE = 2
+# Seconds a stopped stream keeps its standby encoders, so starting it again skips the process start-up
+ENCODER_STANDBY_TTL = 30
+# Seconds to wait for a new encoder's first frame before retiring the old one on reconfigure
+ENCODER_CUTOVER_TIMEOUT = 2
+# Seconds an encoder gets to finish its output (e.g. an MP4 trailer) after its input is closed, before it is terminated
+ENCODER_STOP_TIMEOUT = 2
+# FFmpeg options that replace the stderr stats line with key=value progress blocks on stdout
+PROGRESS_ARGS = ["-nostats", "-progress", "pipe:1"]
+# Seconds of progress used to measure the encoding speed
+PROGRESS_SPEED_WINDOW = 5
+# Encoding speed below which a stream is flagged as overloaded (1.0x is real time, less a margin for timestamp jitter)
+SPEED_ALERT_THRESHOLD = 0.95
+# Port of the Prometheus metrics endpoint (0 disables it; can be set from the environment)
+METRICS_PORT = int(os.environ.get("STREAMPULSE_METRICS_PORT", "0"))
+# Address the metrics endpoint listens on
+METRICS_HOST = os.environ.get("STREAMPULSE_METRICS_HOST", "127.0.0.1")
+# Default port of the headless control API
+CONTROL_PORT = 8787
+# Address the headless control API listens on
+CONTROL_HOST = "127.0.0.1"
+# Sinks a stream added over the control API may use (file sinks can only come from the config file)
+API_SINKS = ("rtsp", "null")
+# Run each capture source in its own worker process instead of a thread (per stream: "capture_process")
+CAPTURE_PROCESS = False
+# Frame slots in a capture worker's shared-memory ring (a slot is only reused after the parent copied its frame out)
+CAPTURE_RING_SLOTS = 4
+# Seconds to wait for a capture worker to start its camera
+CAPTURE_WORKER_TIMEOUT = 30
+# Restarts allowed after consecutive FFmpeg failures before a stream is marked failed
+RESTART_MAX_ATTEMPTS = 3
+# Seconds to wait before each restart after the first one (the first restart is immediate)
+RESTART_DELAY = 2
+# Seconds an FFmpeg process must run before its exit starts a new count of failures
+RESTART_RESET_WINDOW = 30
+# Last stderr lines kept per process for its exit report
+STDERR_TAIL_LINES = 10
+# Worker threads of the process supervisor for blocking calls (URL resolution, standby encoder spawns)
+SUPERVISOR_WORKERS = 4
+# Seconds between health probes of the RTSP server
+RTSP_PROBE_INTERVAL = 5
+# Seconds to wait for the RTSP server to answer a probe
+RTSP_PROBE_TIMEOUT = 2
+# Seconds between health probes while the RTSP server is down (so a freshly started server is seen quickly)
+RTSP_PROBE_RETRY_INTERVAL = 1
+# Lock protecting the shared backends, trackers and grabbers
+CAPTURE_BACKENDS_LOCK = threading.Lock()
+# Lock protecting the import of the capture modules
+CAPTURE_MODULES_LOCK = threading.Lock()
 
 # Define a dictionary of streams with their configurations
 STREAMS = {
@@ -155,8 +302,3251 @@ STREAMS = {
     }
 }
 
+# Define a pool of preallocated frame buffers that are reused instead of allocated per frame
+class FramePool:
+    # Initialize the pool for a given frame shape
+    def __init__(self, shape, size=FRAME_POOL_SIZE):
+        # Store the number of buffers to keep
+        self.size = max(1, size)
+        # Allocate the buffers for the initial shape
+        self.allocate(shape)
+
+    # Allocate all buffers up front for a frame shape
+    def allocate(self, shape):
+        # Store the frame shape the buffers were allocated for
+        self.shape = tuple(shape)
+        # Allocate the buffers
+        self.buffers = [np.empty(self.shape, dtype=np.uint8) for _ in range(self.size)]
+        # Index of the next buffer to hand out
+        self.index = 0
+
+    # Hand out the next buffer in round-robin order
+    def acquire(self, shape):
+        # Reallocate the pool only if the frame geometry changed
+        if tuple(shape) != self.shape:
+            self.allocate(shape)
+        # Pick the next buffer
+        buffer = self.buffers[self.index]
+        # Advance to the following buffer
+        self.index = (self.index + 1) % len(self.buffers)
+        # Return the buffer
+        return buffer
+
+# Define a frame transport that writes frames into an FFmpeg pipe without per-frame copies
+class FrameTransport:
+    # Initialize the transport with the unbuffered pipe to write into
+    def __init__(self, pipe, pool_size=FRAME_POOL_SIZE):
+        # Store the raw pipe (the unbuffered file underneath FFmpeg stdin)
+        self.pipe = pipe
+        # Number of buffers to preallocate once the frame shape is known
+        self.pool_size = pool_size
+        # Buffer pool, created lazily on the first non-contiguous frame
+        self.pool = None
+        # Total frames written
+        self.frames_written = 0
+        # Total bytes written to the pipe
+        self.bytes_written = 0
+        # Total bytes copied before writing (0 when frames are passed through)
+        self.bytes_copied = 0
+        # Longest single write in seconds (how long a slow encoder stalled the pipe)
+        self.max_write_time = 0.0
+
+    # Return a byte view of a frame, copying into a pooled buffer only if the frame is not contiguous
+    def view(self, frame):
+        # Pass contiguous frames straight through
+        if frame.flags.c_contiguous:
+            return memoryview(frame).cast("B")
+        # Create the pool on first use
+        if self.pool is None:
+            self.pool = FramePool(frame.shape, self.pool_size)
+        # Take a preallocated buffer from the pool
+        buffer = self.pool.acquire(frame.shape)
+        # Copy the strided frame into the buffer
+        np.copyto(buffer, frame)
+        # Account for the copy
+        self.bytes_copied += buffer.nbytes
+        # Return a byte view of the buffer
+        return memoryview(buffer).cast("B")
+
+    # Write one frame into the pipe
+    def write(self, frame):
+        # Record when the write started
+        start = time.perf_counter()
+        # Get a byte view of the frame
+        view = self.view(frame)
+        # Remember the frame size
+        size = view.nbytes
+        # Keep writing until the whole frame is in the pipe (raw writes may be partial)
+        while view.nbytes:
+            # Write as much as the pipe accepts
+            written = self.pipe.write(view)
+            # Advance past the written bytes
+            view = view[written:]
+        # Update counters
+        self.frames_written += 1
+        self.bytes_written += size
+        # Track the longest the pipe blocked a single write
+        self.max_write_time = max(self.max_write_time, time.perf_counter() - start)
+        # Return the number of bytes written
+        return size
+
+    # Average number of bytes copied per written frame
+    def copied_per_frame(self):
+        # Avoid division by zero before the first frame
+        return self.bytes_copied / self.frames_written if self.frames_written else 0.0
+
+# Define a pacing scheduler that emits frames on absolute monotonic-clock deadlines
+class FramePacer:
+    # Initialize the pacer for a target frame rate
+    def __init__(self, fps, max_catchup=PACER_MAX_CATCHUP):
+        # Store the frame interval in seconds
+        self.interval = 1.0 / fps
+        # Store the maximum number of catch-up frames
+        self.max_catchup = max(1, max_catchup)
+        # Frames repeated on purpose to hold the frame rate
+        self.duplicated = 0
+        # Frame slots skipped on purpose after a long stall
+        self.dropped = 0
+        # Frames whose deadline had already passed when they were due
+        self.late_frames = 0
+        # Frame rate measured over the last second
+        self.achieved_fps = 0.0
+        # Lateness of the most recent frame against its deadline (seconds)
+        self.drift = 0.0
+        # Start the schedule
+        self.reset()
+
+    # Restart the schedule from the current time
+    def reset(self):
+        # Record the schedule origin
+        self.start = time.monotonic()
+        # Index of the next frame slot
+        self.index = 0
+        # Start a new measurement window
+        self.window_start = self.start
+        self.window_frames = 0
+
+    # Wait until the next frame deadline and return how many frames are due
+    def wait(self):
+        # Absolute deadline of the next frame slot
+        deadline = self.start + self.index * self.interval
+        # Read the clock
+        now = time.monotonic()
+        # Sleep until the deadline if we are early
+        if now < deadline:
+            time.sleep(deadline - now)
+            now = time.monotonic()
+        # Record how late this frame is against its deadline
+        self.drift = now - deadline
+        # Count every slot whose deadline has passed, including this one
+        due = int(self.drift / self.interval) + 1
+        # Count the frame as late if it missed its own slot
+        if due > 1:
+            self.late_frames += 1
+        # Drop slots that are too far behind and rebase the schedule
+        if due > self.max_catchup:
+            # Record the dropped slots
+            self.dropped += due - 1
+            # Move the schedule origin forward past the dropped slots
+            self.start += (due - 1) * self.interval
+            # Only the current frame is written
+            due = 1
+        # Otherwise the extra slots are filled with duplicates
+        else:
+            self.duplicated += due - 1
+        # Advance the schedule by the frames written
+        self.index += due
+        # Update the achieved frame rate once per second
+        self.window_frames += due
+        if now - self.window_start >= 1.0:
+            # Frames per second over the window
+            self.achieved_fps = self.window_frames / (now - self.window_start)
+            # Start a new window
+            self.window_start = now
+            self.window_frames = 0
+        # Return the number of frames to write
+        return due
+
+    # Return a snapshot of the pacing stats
+    def stats(self):
+        # Collect the stats in a dictionary
+        return {
+            "fps": round(self.achieved_fps, 1),
+            "drift_ms": round(self.drift * 1000, 1),
+            "late": self.late_frames,
+            "dup": self.duplicated,
+            "drop": self.dropped
+        }
+
+# Define a bounded frame queue between capture and the pipe writer that drops the oldest frames when full
+class FrameQueue:
+    # Initialize the queue for a frame rate and latency budget
+    def __init__(self, fps, latency=FRAME_QUEUE_LATENCY):
+        # Hold at most the frames that fit in the latency budget
+        self.capacity = max(1, int(round(latency * fps)))
+        # Store the latency budget in seconds
+        self.latency = latency
+        # Queued (enqueue time, frame, repeat count) entries
+        self.items = deque()
+        # Condition used to wake the writer
+        self.condition = threading.Condition()
+        # Set when the producer is done
+        self.closed = False
+        # Frame slots dropped because they were too old or the queue was full
+        self.dropped = 0
+
+    # Queue a frame to be written count times, dropping the oldest entries if the queue is full
+    def put(self, frame, count=1):
+        with self.condition:
+            # Make room by dropping the oldest entries
+            while len(self.items) >= self.capacity:
+                self.dropped += self.items.popleft()[2]
+            # Queue the frame with its enqueue time
+            self.items.append((time.monotonic(), frame, count))
+            # Wake the writer
+            self.condition.notify()
+
+    # Return the next (frame, count) entry within the latency budget, or None on timeout or close
+    def get(self, timeout=None):
+        with self.condition:
+            # Wait for an entry unless the queue is closed
+            if not self.items and not self.closed:
+                self.condition.wait(timeout)
+            # Nothing to write
+            if not self.items:
+                return None
+            # Drop entries that waited longer than the budget, always keeping the newest
+            now = time.monotonic()
+            while len(self.items) > 1 and now - self.items[0][0] > self.latency:
+                self.dropped += self.items.popleft()[2]
+            # Hand out the oldest remaining entry
+            _, frame, count = self.items.popleft()
+            return frame, count
+
+    # Stop the queue and wake the writer
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    # Current number of queued entries
+    def depth(self):
+        return len(self.items)
+
+# Format a stream metrics dictionary as a short, human-readable string
+def format_metrics(metrics):
+    # Return an empty string when there are no metrics
+    if not metrics:
+        return ""
+    # Labels for the known metrics, in display order
+    labels = [("fps", "{} fps"), ("drift_ms", "drift {} ms"), ("late", "late {}"), ("dup", "dup {}"), ("drop", "drop {}"), ("sent", "sent {}"), ("skipped", "skipped {}"),
+              ("queue", "queue {}"), ("queue_drop", "queue drop {}"), ("stall_ms", "stall {} ms"), ("ttff_ms", "ttff {} ms"),
+              ("speed", "speed {}x"), ("enc_fps", "enc {} fps"), ("bitrate_kbps", "{} kbps"), ("enc_dup", "enc dup {}"), ("enc_drop", "enc drop {}"), ("out_time_s", "out {} s")]
+    # Join the metrics that are present
+    return ", ".join(fmt.format(metrics[key]) for key, fmt in labels if metrics.get(key) is not None)
+
+# Define a parser for FFmpeg -progress output that turns each block into encoder metrics
+class EncoderProgress:
+    # Initialize the parser
+    def __init__(self, window=PROGRESS_SPEED_WINDOW):
+        # Key/value pairs of the block being read
+        self.fields = {}
+        # Recent (wall clock, output time) samples for the windowed speed
+        self.samples = deque()
+        # Length of the speed window in seconds
+        self.window = window
+
+    # Convert a progress value to a float, or None if FFmpeg reports N/A
+    @staticmethod
+    def number(value, suffix=""):
+        try:
+            return float(value[:-len(suffix)] if suffix and value.endswith(suffix) else value)
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    # Feed one line of progress output and return the metrics when a block is complete, else None
+    def parse(self, line):
+        # Split the key=value pair
+        key, _, value = line.strip().partition("=")
+        # Collect the fields until the block ends
+        if key != "progress":
+            self.fields[key] = value
+            return None
+        # Read the output time in seconds
+        out_us = self.number(self.fields.get("out_time_us"))
+        out_time = out_us / 1e6 if out_us is not None else None
+        # Keep the samples covering the speed window (plus the one just before it as the baseline)
+        now = time.monotonic()
+        if out_time is not None:
+            self.samples.append((now, out_time))
+        while len(self.samples) > 1 and now - self.samples[1][0] >= self.window:
+            self.samples.popleft()
+        # Measure the speed over the window, falling back to FFmpeg's average since start
+        span = self.samples[-1][0] - self.samples[0][0] if self.samples else 0
+        full = span >= self.window * 0.8
+        speed = (self.samples[-1][1] - self.samples[0][1]) / span if full else self.number(self.fields.get("speed"), "x")
+        # Build the metrics
+        metrics = {
+            "speed": round(speed, 2) if speed is not None else None,
+            "speed_measured": full,
+            "enc_fps": self.number(self.fields.get("fps")),
+            "bitrate_kbps": self.number(self.fields.get("bitrate"), "kbits/s"),
+            "enc_dup": int(self.number(self.fields.get("dup_frames")) or 0),
+            "enc_drop": int(self.number(self.fields.get("drop_frames")) or 0),
+            "out_time_s": round(out_time, 1) if out_time is not None else None,
+            "ended": value == "end"
+        }
+        # Start the next block
+        self.fields = {}
+        # Return the metrics
+        return metrics
+
+# Import the capture and image modules on first use (the Windows capture modules stay None off Windows)
+def load_capture_modules():
+    global np, cv2, shared_memory, dxcam, gw, get_monitors
+    with CAPTURE_MODULES_LOCK:
+        # Do nothing if they are already loaded (numpy is bound last)
+        if np is not None:
+            return
+        # Record the import time
+        started = time.perf_counter()
+        # Import pygetwindow for window management on Windows (optional off Windows)
+        try:
+            import pygetwindow as gw
+        except ImportError:
+            gw = None
+        # Import get_monitors from screeninfo to detect monitor configurations (optional off Windows)
+        try:
+            from screeninfo import get_monitors
+        except ImportError:
+            get_monitors = None
+        # Import dxcam for high-performance screen capture (optional off Windows)
+        try:
+            import dxcam
+        except ImportError:
+            dxcam = None
+        # Import shared_memory for the frame rings between capture workers and feeders
+        from multiprocessing import shared_memory
+        # Import OpenCV (cv2) for scaling, color conversion and file replay, then NumPy for the frame buffers
+        try:
+            import cv2
+            import numpy as np
+        # Refuse window capture without them
+        except ImportError as e:
+            raise RuntimeError(f"Window capture requires numpy and opencv-python: {str(e)}")
+        # Log the import time
+        logger.info(f"Loaded capture modules in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+# Describe a monitor by its position and size (same fields as screeninfo monitors)
+MonitorInfo = namedtuple("MonitorInfo", ["x", "y", "width", "height"])
+
+# Define the interface every capture backend implements
+class CaptureBackend:
+    # Registry key the backend was created from (lets capture workers create the same backend)
+    key = None
+    # Whether create_camera returns one shared camera per output (which can capture only one region at a time)
+    shared_cameras = False
+
+    # Return the capture rectangle (left, top, width, height) of each named window (None if not found) from one enumeration
+    def find_windows(self, window_names):
+        raise NotImplementedError
+
+    # Return the capture rectangle of a single window, or None if not found
+    def find_window(self, window_name):
+        return self.find_windows([window_name])[window_name]
+
+    # Return the list of monitors (objects with x, y, width and height)
+    def get_monitors(self):
+        raise NotImplementedError
+
+    # Return a cheap value that changes when the display configuration changes
+    def display_signature(self):
+        return None
+
+    # Create a camera for a monitor (start/stop/get_latest_frame/is_capturing, like DXCamera)
+    def create_camera(self, output_idx):
+        raise NotImplementedError
+
+# Define the Windows desktop capture backend built on pygetwindow, screeninfo and dxcam
+class DXCamBackend(CaptureBackend):
+    # dxcam keeps one camera per output
+    shared_cameras = True
+
+    # Initialize the backend
+    def __init__(self):
+        # Refuse to run without the Windows capture modules
+        if dxcam is None or gw is None or get_monitors is None:
+            raise RuntimeError("dxcam capture requires Windows with dxcam, pygetwindow and screeninfo installed")
+
+    # Find the first window whose title contains each name, enumerating the windows once
+    def find_windows(self, window_names):
+        # Enumerate all windows once, keeping their lowercase titles
+        windows = [(w.title.lower(), w) for w in gw.getAllWindows()]
+        # Map each name to its capture rectangle
+        found = {}
+        for window_name in window_names:
+            # Search the windows for a case-insensitive title match
+            window = next((w for title, w in windows if window_name.lower() in title), None)
+            # Store the capture rectangle, skipping the window border, or None if not found
+            found[window_name] = (window.left + WINDOW_X_OFFSET, window.top, window.width, window.height) if window else None
+        # Return the rectangles
+        return found
+
+    # Return the monitors reported by screeninfo
+    def get_monitors(self):
+        return get_monitors()
+
+    # Return the monitor count and virtual screen bounds, which change with the display configuration
+    def display_signature(self):
+        return tuple(ctypes.windll.user32.GetSystemMetrics(index) for index in DISPLAY_METRICS)
+
+    # Create a DXCamera on the given output
+    def create_camera(self, output_idx):
+        return dxcam.create(device_idx=0, output_idx=output_idx)
+
+# Define a camera that replays a fixed list of frames at the target frame rate
+class ReplayCamera:
+    # Initialize the camera with a function that produces the frame list for a region
+    def __init__(self, load_frames):
+        # Store the frame loader
+        self.load_frames = load_frames
+        # Camera is not capturing until started
+        self.is_capturing = False
+
+    # Start producing frames for a region (left, top, right, bottom)
+    def start(self, target_fps=30, region=None, video_mode=True):
+        # Load the frames for the region
+        self.frames = self.load_frames(region)
+        # Store the frame interval
+        self.interval = 1.0 / target_fps
+        # Time the next frame becomes available
+        self.next_time = time.monotonic()
+        # Index of the next frame
+        self.index = 0
+        # Mark the camera as capturing
+        self.is_capturing = True
+
+    # Wait for the next frame and return it, like DXCamera.get_latest_frame
+    def get_latest_frame(self):
+        # Return nothing once stopped
+        if not self.is_capturing:
+            return None
+        # Wait until the next frame is due
+        delay = self.next_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        # Schedule the following frame without accumulating lag
+        self.next_time = max(self.next_time + self.interval, time.monotonic())
+        # Get the next frame from the replay list
+        frame = self.frames[self.index % len(self.frames)]
+        # Advance to the following frame
+        self.index += 1
+        # Return the frame
+        return frame
+
+    # Stop producing frames
+    def stop(self):
+        self.is_capturing = False
+
+# Define a backend that produces a moving test pattern without any desktop
+class SyntheticBackend(CaptureBackend):
+    # Number of distinct pattern frames to cycle through
+    PATTERN_FRAMES = 10
+
+    # Initialize the backend with the size of the fake window
+    def __init__(self, size=SOURCE_SIZE):
+        # Store the source size
+        self.width, self.height = size
+
+    # Every window name resolves to the whole synthetic source
+    def find_windows(self, window_names):
+        return {window_name: (0, 0, self.width, self.height) for window_name in window_names}
+
+    # Report a single monitor the size of the source
+    def get_monitors(self):
+        return [MonitorInfo(0, 0, self.width, self.height)]
+
+    # Create a camera that cycles through the test pattern
+    def create_camera(self, output_idx):
+        return ReplayCamera(self.pattern)
+
+    # Build the test pattern frames for a region
+    def pattern(self, region):
+        # Use the whole source when no region is given
+        left, top, right, bottom = region or (0, 0, self.width, self.height)
+        # Compute the region size
+        width, height = right - left, bottom - top
+        # Build a gradient background
+        base = np.zeros((height, width, 3), dtype=np.uint8)
+        base[..., 0] = np.linspace(0, 255, width, dtype=np.uint8)[None, :]
+        base[..., 1] = np.linspace(0, 255, height, dtype=np.uint8)[:, None]
+        # Width of the moving bar
+        bar = max(1, width // 32)
+        # Create frames with a bar sweeping across the gradient
+        frames = []
+        for i in range(self.PATTERN_FRAMES):
+            # Copy the background
+            frame = base.copy()
+            # Draw the bar at this frame's position
+            x = i * width // self.PATTERN_FRAMES
+            frame[:, x:x + bar] = 255
+            # Add the frame to the list
+            frames.append(frame)
+        # Return the frames
+        return frames
+
+# Define a backend that replays a raw rgb24 file or a video file
+class FileReplayBackend(CaptureBackend):
+    # File extensions treated as headerless rgb24 frames
+    RAW_EXTENSIONS = (".rgb", ".raw", ".rgb24")
+    # Maximum number of video frames decoded into memory and looped
+    MAX_VIDEO_FRAMES = 120
+
+    # Initialize the backend with the file path and the frame size for raw files
+    def __init__(self, path, size=SOURCE_SIZE):
+        # Store the file path
+        self.path = path
+        # Check whether the file holds raw frames
+        self.raw = path.lower().endswith(self.RAW_EXTENSIONS)
+        # Raw files need the frame size from the configuration
+        if self.raw:
+            self.width, self.height = size
+        # Video files report their own frame size
+        else:
+            # Open the video to read its size
+            capture = cv2.VideoCapture(path)
+            # Fail if the file cannot be opened
+            if not capture.isOpened():
+                raise ValueError(f"Cannot open video file '{path}'")
+            # Read the frame size
+            self.width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            # Release the video
+            capture.release()
+
+    # Every window name resolves to the whole file frame
+    def find_windows(self, window_names):
+        return {window_name: (0, 0, self.width, self.height) for window_name in window_names}
+
+    # Report a single monitor the size of the file frames
+    def get_monitors(self):
+        return [MonitorInfo(0, 0, self.width, self.height)]
+
+    # Create a camera that replays the file in a loop
+    def create_camera(self, output_idx):
+        return ReplayCamera(self.load)
+
+    # Load the file frames cropped to a region
+    def load(self, region):
+        # Use the whole frame when no region is given
+        left, top, right, bottom = region or (0, 0, self.width, self.height)
+        # Map raw files without reading them into memory
+        if self.raw:
+            # Memory-map the file as a sequence of frames
+            data = np.memmap(self.path, dtype=np.uint8, mode="r")
+            # Compute the number of whole frames in the file
+            count = data.size // (self.width * self.height * 3)
+            # Fail if the file is shorter than one frame
+            if count == 0:
+                raise ValueError(f"Raw file '{self.path}' is smaller than one {self.width}x{self.height} frame")
+            # Reshape into frames and crop to the region
+            frames = data[:count * self.width * self.height * 3].reshape(count, self.height, self.width, 3)
+            return [frame[top:bottom, left:right] for frame in frames]
+        # Decode the first frames of the video file
+        capture = cv2.VideoCapture(self.path)
+        frames = []
+        while len(frames) < self.MAX_VIDEO_FRAMES:
+            # Read the next frame
+            ok, frame = capture.read()
+            # Stop at the end of the file
+            if not ok:
+                break
+            # Convert from BGR to RGB and crop to the region
+            frames.append(np.ascontiguousarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)[top:bottom, left:right]))
+        # Release the video
+        capture.release()
+        # Fail if the file has no frames
+        if not frames:
+            raise ValueError(f"No frames decoded from '{self.path}'")
+        # Return the frames
+        return frames
+
+# Create (or reuse) the capture backend configured for a window stream
+def create_capture_backend(stream):
+    # Get the backend name from the stream, falling back to the default
+    kind = stream.get("backend", CAPTURE_BACKEND)
+    # Identify the backend by its name and parameters so streams can share it
+    if kind == "dxcam":
+        key = (kind,)
+    elif kind == "synthetic":
+        key = (kind, tuple(stream.get("source_size", SOURCE_SIZE)))
+    elif kind == "file":
+        key = (kind, stream["name"], tuple(stream.get("source_size", SOURCE_SIZE)))
+    # Reject unknown backends
+    else:
+        raise ValueError(f"Unknown capture backend '{kind}'")
+    # Create the backend once and share it between streams
+    with CAPTURE_BACKENDS_LOCK:
+        if key not in CAPTURE_BACKENDS:
+            CAPTURE_BACKENDS[key] = build_capture_backend(key)
+        # Return the shared backend
+        return CAPTURE_BACKENDS[key]
+
+# Create a new capture backend from its registry key
+def build_capture_backend(key):
+    # Import the capture modules (also in capture worker processes)
+    load_capture_modules()
+    # Desktop window capture
+    if key[0] == "dxcam":
+        backend = DXCamBackend()
+    # Synthetic test pattern
+    elif key[0] == "synthetic":
+        backend = SyntheticBackend(key[1])
+    # File replay, using the stream source as the file path
+    else:
+        backend = FileReplayBackend(key[1], key[2])
+    # Remember the key
+    backend.key = key
+    # Return the backend
+    return backend
+
+# Define a subscription to the geometry of one window
+class WindowSubscription:
+    # Initialize the subscription
+    def __init__(self, window_name, geometry):
+        # Store the window name (title substring)
+        self.window_name = window_name
+        # Latest capture rectangle, or None if the window is not found
+        self.geometry = geometry
+        # Event set whenever the geometry changes
+        self.changed = threading.Event()
+
+    # Wait up to timeout seconds for a geometry change
+    def wait(self, timeout):
+        # Wait for the change event
+        changed = self.changed.wait(timeout)
+        # Reset it for the next change
+        self.changed.clear()
+        # Return whether the geometry changed
+        return changed
+
+# Define a service that enumerates windows once per tick for all streams of a backend
+class WindowTracker:
+    # Initialize the tracker for a capture backend
+    def __init__(self, backend, interval=WINDOW_POLL_INTERVAL):
+        # Store the backend used to enumerate windows
+        self.backend = backend
+        # Store the polling interval
+        self.interval = interval
+        # Index from title substring to the latest capture rectangle
+        self.index = {}
+        # Subscriptions per title substring
+        self.subscribers = {}
+        # Lock protecting the index and the subscriptions
+        self.lock = threading.Lock()
+        # Polling thread, running only while there are subscribers
+        self.thread = None
+        # Number of window enumerations performed (for debugging)
+        self.enumerations = 0
+
+    # Subscribe to geometry changes of a window
+    def subscribe(self, window_name):
+        # Look the window up right away if nobody tracks it yet
+        with self.lock:
+            known = window_name in self.index
+        if not known:
+            geometry = self.backend.find_window(window_name)
+            self.enumerations += 1
+        # Register the subscription and start polling if needed
+        with self.lock:
+            # Remember the first lookup
+            if not known:
+                self.index[window_name] = geometry
+            # Create the subscription with the current geometry
+            subscription = WindowSubscription(window_name, self.index[window_name])
+            self.subscribers.setdefault(window_name, []).append(subscription)
+            # Start the polling thread if it is not running
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        # Return the subscription
+        return subscription
+
+    # Remove a subscription
+    def unsubscribe(self, subscription):
+        # Remove it from the subscriber list
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.window_name, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            # Forget windows nobody tracks anymore
+            if not subscribers:
+                self.subscribers.pop(subscription.window_name, None)
+                self.index.pop(subscription.window_name, None)
+
+    # Poll the windows once per interval while there are subscribers
+    def run(self):
+        # Keep polling
+        while True:
+            # Wait for the next tick
+            time.sleep(self.interval)
+            # Take the names to look up, or stop when there are no subscribers
+            with self.lock:
+                names = list(self.subscribers)
+                if not names:
+                    self.thread = None
+                    return
+            # Enumerate the windows once for all names
+            try:
+                found = self.backend.find_windows(names)
+                self.enumerations += 1
+            # Keep polling after enumeration errors
+            except Exception as e:
+                logger.error(f"Window enumeration failed: {str(e)}")
+                continue
+            # Publish geometry changes to the subscribers
+            with self.lock:
+                for window_name, geometry in found.items():
+                    # Skip names that were unsubscribed meanwhile or did not change
+                    if window_name not in self.subscribers or self.index.get(window_name) == geometry:
+                        continue
+                    # Update the index
+                    self.index[window_name] = geometry
+                    # Notify every subscriber of the window
+                    for subscription in self.subscribers[window_name]:
+                        subscription.geometry = geometry
+                        subscription.changed.set()
+
+# Define a cache of the monitor layout with interval lookups from a point to a monitor
+class MonitorTopology:
+    # Initialize the cache for a capture backend
+    def __init__(self, backend, refresh_interval=MONITOR_REFRESH_INTERVAL):
+        # Store the backend used to query the monitors
+        self.backend = backend
+        # Store the maximum cache age
+        self.refresh_interval = refresh_interval
+        # Cached monitors
+        self.monitors = []
+        # Cached monitor rectangles
+        self.layout = []
+        # Display signature of the cached monitors
+        self.signature = None
+        # Time of the last query
+        self.queried_at = None
+        # Sorted horizontal and vertical monitor edges
+        self.xs = []
+        self.ys = []
+        # Monitor index of every grid cell between the edges
+        self.cells = {}
+        # Number of times the monitors were queried (for debugging)
+        self.queries = 0
+        # Lock protecting refreshes
+        self.lock = threading.Lock()
+
+    # Query the monitors again if the display configuration changed or the cache is too old
+    def refresh(self):
+        # Read the cheap display signature
+        signature = self.backend.display_signature()
+        # Keep the cache while the signature and age allow it
+        if self.queried_at is not None and signature == self.signature and time.monotonic() - self.queried_at < self.refresh_interval:
+            return
+        # Query the monitors
+        monitors = list(self.backend.get_monitors())
+        # Collect the monitor edges
+        xs = sorted({m.x for m in monitors} | {m.x + m.width for m in monitors})
+        ys = sorted({m.y for m in monitors} | {m.y + m.height for m in monitors})
+        # Map every grid cell to the first monitor covering it
+        cells = {}
+        for index, m in enumerate(monitors):
+            for ix in range(xs.index(m.x), xs.index(m.x + m.width)):
+                for iy in range(ys.index(m.y), ys.index(m.y + m.height)):
+                    cells.setdefault((ix, iy), index)
+        # Count the query
+        self.queries += 1
+        # Describe the layout to detect real changes
+        layout = [(m.x, m.y, m.width, m.height) for m in monitors]
+        # Log the refresh when the layout changed, or every query in debug mode
+        if layout != self.layout:
+            logger.info(f"Monitor topology changed: {layout}, query #{self.queries}")
+        elif DEBUG_MODE:
+            logger.debug(f"Monitor topology re-queried, query #{self.queries}")
+        # Store the new topology
+        self.monitors, self.layout, self.xs, self.ys, self.cells = monitors, layout, xs, ys, cells
+        self.signature = signature
+        self.queried_at = time.monotonic()
+
+    # Return the index and monitor containing a point (monitor 0 if none does)
+    def locate(self, x, y):
+        # Refresh the cache under the lock
+        with self.lock:
+            self.refresh()
+            # Find the grid cell of the point
+            ix = bisect.bisect_right(self.xs, x) - 1
+            iy = bisect.bisect_right(self.ys, y) - 1
+            # Look up the monitor of the cell
+            index = self.cells.get((ix, iy), 0)
+            # Return the index and the monitor
+            return index, self.monitors[index]
+
+# Return the shared monitor topology cache of a capture backend
+def get_monitor_topology(backend):
+    # Create the cache on first use
+    with CAPTURE_BACKENDS_LOCK:
+        if id(backend) not in MONITOR_TOPOLOGIES:
+            MONITOR_TOPOLOGIES[id(backend)] = MonitorTopology(backend)
+        # Return the cache
+        return MONITOR_TOPOLOGIES[id(backend)]
+
+# Define a grabber that captures one region once and fans the frames out to every stream using it
+class FrameGrabber:
+    # Initialize the grabber and start its camera
+    def __init__(self, key, backend, output_idx, region, fps):
+        # Store the registry key
+        self.key = key
+        # Create a camera from the capture backend
+        self.camera = backend.create_camera(output_idx)
+        if self.camera is None:
+            # Fallback to output 0 if creation fails
+            logger.error(f"DXCamera failed on output {output_idx}, falling back to 0")
+            self.camera = backend.create_camera(0)
+            output_idx = 0
+        # Store the output index actually used
+        self.output_idx = output_idx
+        # Store the capture region and frame rate
+        self.region = region
+        self.fps = fps
+        # Latest frame and its sequence number, shared by all readers
+        self.frame = None
+        self.sequence = 0
+        # Condition used to wake readers when a new frame arrives
+        self.condition = threading.Condition()
+        # Number of streams using the grabber
+        self.users = 0
+        # Frame rate and region requested by a new user, applied by the capture thread (which owns the camera)
+        self.requested_fps = fps
+        self.requested_region = region
+        # Top-left corner of the grabbed region on the output, published with each frame
+        self.origin = region[:2] if region else (0, 0)
+        # Count this grabber as a user of the camera, starting it unless another grabber already runs it
+        CAMERA_USERS[id(self.camera)] = CAMERA_USERS.get(id(self.camera), 0) + 1
+        if CAMERA_USERS[id(self.camera)] == 1:
+            self.camera.start(target_fps=fps, region=region, video_mode=True)
+            logger.info(f"Started DXCamera on output {output_idx} with region {region}")
+        # Start the capture thread
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    # Capture frames and publish each one to the readers
+    def run(self):
+        # Keep capturing until stopped
+        while self.running:
+            try:
+                # Restart the camera at a higher frame rate or a wider region if a new user asked for one and no other grabber uses it
+                if (self.requested_fps > self.fps or self.requested_region != self.region) and CAMERA_USERS.get(id(self.camera)) == 1:
+                    self.camera.stop()
+                    self.camera.start(target_fps=self.requested_fps, region=self.requested_region, video_mode=True)
+                    self.fps = self.requested_fps
+                    self.region = self.requested_region
+                    logger.info(f"Restarted DXCamera on output {self.output_idx} with region {self.region} at {self.fps} fps")
+                # Get the latest frame from the camera
+                frame = self.camera.get_latest_frame() if self.camera.is_capturing else None
+            # Log capture errors and keep trying (the streams see no new frames meanwhile)
+            except Exception as e:
+                logger.error(f"Capture failed on output {self.output_idx} with region {self.region}: {str(e)}")
+                time.sleep(0.5)
+                continue
+            # Wait briefly if the camera has nothing
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            # Publish the frame with the corner of its region and wake the readers
+            with self.condition:
+                self.frame = frame
+                self.origin = self.region[:2] if self.region else (0, 0)
+                self.sequence += 1
+                self.condition.notify_all()
+
+    # Raise the capture frame rate if a new user needs more (applied by the capture thread)
+    def ensure_fps(self, fps):
+        self.requested_fps = max(self.requested_fps, fps)
+
+    # Widen the grab to cover a region too (None is the whole output), returning True if it had to grow (applied by the capture thread)
+    def cover(self, region):
+        # Nothing to do if the grab already covers the region
+        current = self.requested_region
+        if current is None or (region is not None and current[0] <= region[0] and current[1] <= region[1] and current[2] >= region[2] and current[3] >= region[3]):
+            return False
+        # Grab the bounding box of both regions
+        self.requested_region = None if region is None else (min(current[0], region[0]), min(current[1], region[1]), max(current[2], region[2]), max(current[3], region[3]))
+        return True
+
+    # Stop the capture thread, and the camera once no other grabber uses it
+    def stop(self):
+        # Stop the capture thread
+        self.running = False
+        # Stop the camera when its last grabber stops
+        CAMERA_USERS[id(self.camera)] -= 1
+        if CAMERA_USERS[id(self.camera)] <= 0:
+            CAMERA_USERS.pop(id(self.camera), None)
+            self.camera.stop()
+        # Wake any waiting readers
+        with self.condition:
+            self.condition.notify_all()
+        logger.info(f"Stopped DXCamera on output {self.output_idx} with region {self.region}")
+
+# Define one stream's view of a shared grabber, usable wherever a camera is expected
+class GrabberView:
+    # Initialize the view, optionally slicing a region out of a larger grab
+    def __init__(self, grabber, crop=None):
+        # Store the grabber
+        self.grabber = grabber
+        # Region (left, top, right, bottom) of the output to slice from each frame, or None for the whole frame
+        self.crop = crop
+        # Store the output index actually used
+        self.output_idx = grabber.output_idx
+        # Sequence number of the last frame returned
+        self.sequence = 0
+        # View is capturing until released
+        self.released = False
+
+    # Whether the shared capture is running for this view
+    @property
+    def is_capturing(self):
+        return not self.released and self.grabber.running
+
+    # Wait for a frame newer than the last one returned, or return None after one frame interval
+    def get_latest_frame(self):
+        # Wait on the grabber condition
+        with self.grabber.condition:
+            # Wait until a new frame arrives, the grabber stops, or the timeout expires
+            self.grabber.condition.wait_for(lambda: self.grabber.sequence != self.sequence or not self.grabber.running, timeout=1.0 / self.grabber.fps)
+            # Return nothing if no new frame arrived
+            if self.grabber.sequence == self.sequence:
+                return None
+            # Remember the frame returned
+            self.sequence = self.grabber.sequence
+            # Get the shared frame and where it was grabbed
+            frame = self.grabber.frame
+            x, y = self.grabber.origin
+        # Return the whole frame, or a zero-copy slice of the region (cut short while a wider grab is starting)
+        if self.crop is None:
+            return frame
+        left, top, right, bottom = self.crop
+        return frame[max(0, top - y):max(0, bottom - y), max(0, left - x):max(0, right - x)]
+
+    # Release the view (the grabber stops when its last view is released)
+    def stop(self):
+        # Release only once
+        if not self.released:
+            self.released = True
+            release_grabber(self.grabber)
+
+# Define a ring of frame slots in shared memory, written by a capture worker and read by the feeders
+class FrameRing:
+    # Create the ring, or attach to an existing one by name
+    def __init__(self, shape, dtype, slots, name=None):
+        # Store the frame shape, type and number of slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        # Create or open the shared memory block
+        size = int(np.prod(self.shape)) * self.dtype.itemsize * slots
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        # Store the name the other process attaches with
+        self.name = self.memory.name
+        # Map the slots as one array of frames
+        self.frames = np.ndarray((slots,) + self.shape, self.dtype, buffer=self.memory.buf)
+
+    # Close the ring (and remove it when unlink is set)
+    def close(self, unlink=False):
+        # Drop the frame array
+        self.frames = None
+        # Unmap the block
+        self.memory.close()
+        # Remove the shared memory block (existing mappings stay valid)
+        if unlink:
+            self.memory.unlink()
+
+# Run a capture source in a worker process, publishing its frames through a shared-memory ring
+def capture_worker(backend_key, output_idx, region, fps, slots, conn):
+    # Camera and ring, created below
+    camera = None
+    ring = None
+    try:
+        # Create the backend and the camera in this process
+        backend = build_capture_backend(backend_key)
+        camera = backend.create_camera(output_idx)
+        if camera is None:
+            # Fallback to output 0 if creation fails
+            conn.send(("error", f"DXCamera failed on output {output_idx}, falling back to 0"))
+            camera = backend.create_camera(0)
+            output_idx = 0
+        # Start the camera and report the output actually used
+        camera.start(target_fps=fps, region=region, video_mode=True)
+        conn.send(("started", output_idx))
+        # Number of frames published
+        sequence = 0
+        # Slots the parent has copied out and handed back (all of them at first)
+        free_slots = deque(range(slots))
+        # Capture until the parent stops the worker
+        while True:
+            # Apply the parent's commands (stop, hand back a slot, or restart the camera at a new frame rate)
+            while conn.poll():
+                command, value = conn.recv()
+                if command == "stop":
+                    return
+                if command == "done":
+                    free_slots.append(value)
+                    continue
+                camera.stop()
+                camera.start(target_fps=value, region=region, video_mode=True)
+            # Wait for the parent to hand back a slot if all of them are still being copied (the frame is skipped)
+            if not free_slots:
+                conn.poll(0.01)
+                continue
+            # Get the latest frame from the camera
+            frame = camera.get_latest_frame() if camera.is_capturing else None
+            # Wait briefly if the camera has nothing
+            if frame is None:
+                time.sleep(0.01)
+                continue
+            # Create the ring once the frame shape is known, and tell the parent where it is
+            if ring is None:
+                ring = FrameRing(frame.shape, frame.dtype, slots)
+                conn.send(("ring", ring.name, frame.shape, frame.dtype.str, slots))
+            # Copy the frame into a free slot and announce it
+            slot = free_slots.popleft()
+            np.copyto(ring.frames[slot], frame)
+            sequence += 1
+            conn.send(("frame", sequence, slot))
+    # The parent went away
+    except (EOFError, BrokenPipeError):
+        pass
+    # Report any other failure to the parent
+    except Exception as e:
+        try:
+            conn.send(("error", f"Capture worker failed: {str(e)}"))
+        except OSError:
+            pass
+    # Stop the camera and remove the ring
+    finally:
+        if camera is not None:
+            camera.stop()
+        if ring is not None:
+            ring.close(unlink=True)
+
+# Define a grabber that captures one region in a worker process and fans the frames out like FrameGrabber
+class WorkerFrameGrabber:
+    # Start the worker (wait_started waits for its camera)
+    def __init__(self, key, backend, output_idx, region, fps, slots=CAPTURE_RING_SLOTS):
+        # Store the registry key
+        self.key = key
+        # Store the capture region and frame rate
+        self.region = region
+        self.fps = fps
+        # Latest frame (copied out of the ring) and its sequence number, shared by all readers
+        self.frame = None
+        self.sequence = 0
+        # Top-left corner of the grabbed region on the output
+        self.origin = region[:2] if region else (0, 0)
+        # Condition used to wake readers when a new frame arrives
+        self.condition = threading.Condition()
+        # Number of streams using the grabber
+        self.users = 0
+        # Frame ring, attached when the worker reports it
+        self.ring = None
+        # Requested output, replaced by the one the worker actually uses once it started
+        self.output_idx = output_idx
+        # Set when the worker started its camera, or exited before that
+        self.started = threading.Event()
+        self.camera_started = False
+        # Lock serializing the messages sent to the worker from the receiver and the control threads
+        self.send_lock = threading.Lock()
+        # Start the worker with its end of the message pipe
+        self.conn, worker_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=capture_worker, args=(backend.key, output_idx, region, fps, slots, worker_conn), daemon=True
+        )
+        self.process.start()
+        worker_conn.close()
+        # Receive the messages on one thread
+        self.running = True
+        threading.Thread(target=self.run, daemon=True).start()
+
+    # Wait for the worker to start its camera (called outside the registry lock, so other streams are not held up)
+    def wait_started(self):
+        # Give up if the worker died or did not start in time
+        if not self.started.wait(CAPTURE_WORKER_TIMEOUT) or not self.camera_started:
+            raise RuntimeError(f"Capture worker on output {self.output_idx} did not start")
+
+    # Send a message to the worker from any thread
+    def send(self, message):
+        with self.send_lock:
+            self.conn.send(message)
+
+    # Receive the worker's messages and publish each frame to the readers
+    def run(self):
+        # Keep receiving until the worker exits
+        while True:
+            try:
+                message = self.conn.recv()
+            # The worker exited
+            except (EOFError, OSError):
+                break
+            # Copy a new frame out of the ring, hand the slot back, then wake the readers
+            if message[0] == "frame":
+                frame = self.ring.frames[message[2]].copy()
+                try:
+                    self.send(("done", message[2]))
+                # The worker is stopping
+                except OSError:
+                    pass
+                with self.condition:
+                    self.frame = frame
+                    self.sequence += 1
+                    self.condition.notify_all()
+            # Store the output the worker uses and wake the streams waiting for it
+            elif message[0] == "started":
+                self.output_idx = message[1]
+                self.camera_started = True
+                self.started.set()
+                logger.info(f"Started capture worker {self.process.pid} on output {self.output_idx} with region {self.region}")
+            # Attach to the ring the worker created
+            elif message[0] == "ring":
+                self.ring = FrameRing(message[2], message[3], message[4], message[1])
+            # Log the worker's errors
+            elif message[0] == "error":
+                logger.error(message[1])
+        # Log a worker that exited on its own
+        crashed = self.running
+        if crashed:
+            logger.error(f"Capture worker {self.process.pid} on output {self.output_idx} exited")
+        # Forget the grabber, so later streams start a new worker instead of attaching to this one
+        with CAPTURE_BACKENDS_LOCK:
+            if FRAME_GRABBERS.get(self.key) is self:
+                del FRAME_GRABBERS[self.key]
+        # Stop the readers and any stream still waiting for the start
+        self.running = False
+        self.started.set()
+        with self.condition:
+            self.condition.notify_all()
+        # Release the ring, removing it too if the worker died before it could
+        if self.ring is not None:
+            try:
+                self.ring.close(unlink=crashed)
+            # The worker removed it on its way out
+            except FileNotFoundError:
+                pass
+
+    # Raise the capture frame rate if a new user needs more
+    def ensure_fps(self, fps):
+        # Nothing to do if the camera is fast enough
+        if fps <= self.fps:
+            return
+        # Ask the worker to restart its camera at the higher rate
+        try:
+            self.send(("fps", fps))
+        # The worker exited (the streams using it see the grabber stopped and attach to a new one)
+        except OSError:
+            return
+        self.fps = fps
+        logger.info(f"Raised capture worker {self.process.pid} on output {self.output_idx} to {fps} fps")
+
+    # Stop the worker
+    def stop(self):
+        # Mark the stop as intended
+        self.running = False
+        # Ask the worker to stop
+        try:
+            self.send(("stop", None))
+        except OSError:
+            pass
+        # Wait for it to exit, terminating it if it does not
+        self.process.join(2)
+        if self.process.is_alive():
+            self.process.terminate()
+        logger.info(f"Stopped capture worker on output {self.output_idx} with region {self.region}")
+
+# Attach to the grabber of a region, creating it if no other stream captures the same source
+def acquire_grabber(backend, output_idx, region, fps, per_monitor=False, in_process=False):
+    # Capture workers recreate the backend from its key, so backends without one are captured on a thread
+    if in_process and backend.key is None:
+        logger.warning("Capture backend has no key, capturing on a thread instead of a worker process")
+        in_process = False
+    # Backends with one camera per output (dxcam) get one thread grabber per output, whose grab covers the regions of all its streams
+    shared = backend.shared_cameras and not in_process
+    # In per-monitor mode grab the whole output and slice the region from it
+    grab_region = None if per_monitor else region
+    # Identify the capture source
+    key = (id(backend), output_idx, "camera" if shared else grab_region, in_process)
+    # Find or create the grabber under the lock
+    with CAPTURE_BACKENDS_LOCK:
+        grabber = FRAME_GRABBERS.get(key)
+        # Create the grabber if none exists (in a worker process, or on a thread)
+        if grabber is None:
+            grabber_class = WorkerFrameGrabber if in_process else FrameGrabber
+            grabber = FRAME_GRABBERS[key] = grabber_class(key, backend, output_idx, grab_region, fps)
+        # Otherwise make sure it captures fast enough
+        else:
+            grabber.ensure_fps(fps)
+            # Widen a shared camera's grab if it does not cover this stream's region
+            if shared and grabber.cover(grab_region):
+                logger.warning(f"Output {output_idx} has one camera for all its streams, widening its grab to {grabber.requested_region or 'the whole output'}")
+        # Count the new user
+        grabber.users += 1
+    # Wait for a worker's camera outside the lock, dropping the user if it does not start
+    if in_process:
+        try:
+            grabber.wait_started()
+        except RuntimeError:
+            release_grabber(grabber)
+            raise
+    # Return a view for the stream, slicing its region from grabs that may cover more
+    return GrabberView(grabber, region if per_monitor or shared else None)
+
+# Detach from a grabber, stopping it when no stream uses it anymore
+def release_grabber(grabber):
+    # Update the registry under the lock
+    with CAPTURE_BACKENDS_LOCK:
+        # Count the user as gone
+        grabber.users -= 1
+        # Stop and forget the grabber when unused (a grabber whose worker exited was already replaced in the registry)
+        if grabber.users <= 0:
+            if FRAME_GRABBERS.get(grabber.key) is grabber:
+                del FRAME_GRABBERS[grabber.key]
+            grabber.stop()
+
+# Return the shared window tracker of a capture backend
+def get_window_tracker(backend):
+    # Create the tracker on first use
+    with CAPTURE_BACKENDS_LOCK:
+        if id(backend) not in WINDOW_TRACKERS:
+            WINDOW_TRACKERS[id(backend)] = WindowTracker(backend)
+        # Return the tracker
+        return WINDOW_TRACKERS[id(backend)]
+
+# Build the FFmpeg output arguments for a stream's configured sink
+def output_args(stream_key):
+    # Get the sink from the stream, falling back to the default
+    sink = STREAMS[stream_key].get("sink", OUTPUT_SINK)
+    # Publish to MediaMTX over RTSP
+    if sink == "rtsp":
+        return ["-f", "rtsp", "-rtsp_transport", "tcp", f"rtsp://{RTSP_SERVER}/{stream_key}"]
+    # Encode and discard the output
+    if sink == "null":
+        return ["-f", "null", "-"]
+    # Write to a local file (format chosen from the extension)
+    return ["-y", sink]
+
+# Return the even output size FFmpeg encodes for a captured size and the configured width/height
+def output_size(captured_width, captured_height, width, height):
+    # Use specified width/height or captured dimensions
+    output_width = width if width > 0 else captured_width
+    output_height = height if height > 0 else captured_height
+    # Ensure even dimensions for FFmpeg
+    if output_width % 2 != 0:
+        output_width -= 1
+    if output_height % 2 != 0:
+        output_height -= 1
+    # Return the output size
+    return output_width, output_height
+
+# Define a pre-pipe stage that downscales rgb24 frames and converts them to yuv420p with OpenCV
+class FrameConverter:
+    # Initialize the converter for a captured size and the configured width/height
+    def __init__(self, captured_width, captured_height, width, height, pool_size=FRAME_POOL_SIZE):
+        # Store the captured size
+        self.captured_size = (captured_width, captured_height)
+        # Compute the output size, as FFmpeg would
+        self.width, self.height = output_size(captured_width, captured_height, width, height)
+        # Fit inside the output and pad when both width and height are given (like scale+pad in FFmpeg)
+        if width > 0 and height > 0:
+            scale = min(self.width / captured_width, self.height / captured_height)
+            self.scaled_size = (max(2, int(captured_width * scale) // 2 * 2), max(2, int(captured_height * scale) // 2 * 2))
+        # Otherwise stretch to the output size
+        else:
+            self.scaled_size = (self.width, self.height)
+        # Offset of the scaled frame inside the padded output
+        self.offset = ((self.width - self.scaled_size[0]) // 2, (self.height - self.scaled_size[1]) // 2)
+        # Preallocate the scaled frame if resizing is needed
+        self.scaled = np.empty((self.scaled_size[1], self.scaled_size[0], 3), dtype=np.uint8) if self.scaled_size != self.captured_size else None
+        # Preallocate a black canvas if padding is needed
+        self.canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8) if self.scaled_size != (self.width, self.height) else None
+        # Pool of preallocated yuv420p output buffers (planar, 1.5 bytes per pixel)
+        self.pool = FramePool((self.height * 3 // 2, self.width), pool_size)
+
+    # Convert one rgb24 frame to a yuv420p buffer of the output size
+    def convert(self, frame):
+        # Start from the captured frame
+        rgb = frame
+        # Downscale into the preallocated buffer
+        if self.scaled is not None:
+            cv2.resize(rgb, self.scaled_size, dst=self.scaled, interpolation=cv2.INTER_AREA)
+            rgb = self.scaled
+        # Place the frame in the middle of the padded canvas
+        if self.canvas is not None:
+            x, y = self.offset
+            self.canvas[y:y + self.scaled_size[1], x:x + self.scaled_size[0]] = rgb
+            rgb = self.canvas
+        # Take an output buffer from the pool
+        output = self.pool.acquire(self.pool.shape)
+        # Convert to planar yuv420p
+        cv2.cvtColor(rgb, cv2.COLOR_RGB2YUV_I420, dst=output)
+        # Return the converted frame
+        return output
+
+# Define a change detector that compares sampled rows of each frame with the previous one
+class FrameChangeDetector:
+    # Initialize the detector with the sample stride and difference threshold
+    def __init__(self, stride=STATIC_SAMPLE_STRIDE, threshold=STATIC_DIFF_THRESHOLD):
+        # Store the sampling settings
+        self.stride = stride
+        self.threshold = threshold
+        # Samples of the last changed frame
+        self.previous = None
+        # Count the checked and unchanged frames
+        self.checked = 0
+        self.unchanged = 0
+
+    # Return True if the frame differs from the last changed frame
+    def changed(self, frame):
+        # Take a view of every Nth row of the frame (no copy)
+        sample = frame[::self.stride]
+        # Count the check
+        self.checked += 1
+        # Compare with the previous samples if they have the same shape
+        if self.previous is not None and self.previous.shape == sample.shape:
+            # Exact comparison when no difference is tolerated
+            if self.threshold == 0:
+                same = np.array_equal(sample, self.previous)
+            # Otherwise compare the largest per-sample difference with the threshold
+            else:
+                same = np.abs(sample.astype(np.int16) - self.previous).max() <= self.threshold
+            # Report an unchanged frame
+            if same:
+                self.unchanged += 1
+                return False
+            # Store the new samples in place
+            np.copyto(self.previous, sample)
+        # Store a copy of the samples for the first frame or after a size change
+        else:
+            self.previous = sample.copy()
+        # Report a changed frame
+        return True
+
+    # Forget the previous frame so the next one counts as changed
+    def reset(self):
+        self.previous = None
+
+# Build the FFmpeg command that encodes raw window frames read from stdin
+def build_window_ffmpeg_cmd(stream_key, captured_width, captured_height, width, height, fps, preconvert=False, skip_static=False):
+    # Compute the output size
+    output_width, output_height = output_size(captured_width, captured_height, width, height)
+    # Frames converted before the pipe arrive as yuv420p at the output size and need no filters
+    if preconvert:
+        input_args = ["-pixel_format", "yuv420p", "-video_size", f"{output_width}x{output_height}"]
+        vf_args = []
+    # Otherwise FFmpeg scales and converts the captured rgb24 frames
+    else:
+        input_args = ["-pixel_format", "rgb24", "-video_size", f"{captured_width}x{captured_height}"]
+        # Define video filters for FFmpeg
+        vf_filters = [f"scale={output_width}:{output_height}", "format=rgb24,format=yuv420p"]
+        if width > 0 and height > 0:
+            vf_filters = [
+                f"scale={output_width}:{output_height}:force_original_aspect_ratio=decrease",
+                f"pad={output_width}:{output_height}:(ow-iw)/2:(oh-ih)/2",
+                "format=rgb24,format=yuv420p"
+            ]
+        vf_args = ["-vf", ",".join(vf_filters)]
+    # Frames are sent only when they change, so stamp them with the arrival time and keep the variable rate
+    if skip_static:
+        input_args += ["-use_wallclock_as_timestamps", "1"]
+        vf_args += ["-fps_mode", "passthrough", "-force_key_frames", f"expr:gte(t,n_forced*{STATIC_KEYFRAME_INTERVAL})"]
+    # Return the FFmpeg command
+    return (
+        [FFMPEG_PATH] + PROGRESS_ARGS + ["-f", "rawvideo"] + input_args +
+        ["-framerate", str(fps), "-i", "pipe:0", "-fflags", "nobuffer", "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency"] +
+        vf_args + ["-an"] + output_args(stream_key)
+    )
+
+# Build the yt-dlp format selection for a stream's width/height/fps
+def ytdlp_format_args(width, height, fps):
+    # Prefer the configured codec, then the rendition closest to the target size and frame rate
+    sort = [f"vcodec:{YTDLP_PREFERRED_CODEC}"]
+    # Only keep renditions at or above the target size, falling back to the best one below it
+    if height > 0:
+        selector = f"bv*[height>={height}]/bv*"
+        sort.append(f"height:{height}")
+    elif width > 0:
+        selector = f"bv*[width>={width}]/bv*"
+        sort.append(f"width:{width}")
+    else:
+        selector = "bv*"
+    # Prefer renditions at or below the target frame rate
+    if fps > 0:
+        sort.append(f"fps:{fps}")
+    # Return the yt-dlp options
+    return ["-f", selector, "-S", ",".join(sort)]
+
+# Resolve a YouTube URL to the media URL of the rendition matching a stream's width/height/fps
+def resolve_youtube_url(url, width, height, fps):
+    # Print the chosen format's fields on one line, followed by its URL
+    template = "|".join(f"%({field})s" for field in YTDLP_FORMAT_FIELDS)
+    ytdlp_cmd = [YTDLP_PATH] + ytdlp_format_args(width, height, fps) + ["--print", template, "--print", "urls", url]
+    # Execute yt-dlp under the supervisor and split its output
+    lines = SUPERVISOR.check_output(ytdlp_cmd).strip().splitlines()
+    # Check that a URL was returned
+    if len(lines) < 2 or not lines[1].strip():
+        # Raise an error if no URL is returned
+        raise ValueError("yt-dlp returned empty URL")
+    # Return the URL and the chosen format
+    return lines[1].strip(), dict(zip(YTDLP_FORMAT_FIELDS, lines[0].split("|")))
+
+# Return the expiry time embedded in a googlevideo URL ("expire=" or "/expire/"), or None
+def url_expiry(media_url):
+    # Find the expire parameter in the query or the path
+    match = re.search(r"[?&/]expire[=/](\d+)", media_url)
+    # Return it as a Unix timestamp
+    return int(match.group(1)) if match else None
+
+# Define a cache of resolved YouTube URLs, keyed by source URL and format, refreshed before they expire
+class ResolvedUrlCache:
+    # Initialize an empty cache
+    def __init__(self):
+        # (url, width, height, fps) -> {"url": media URL, "format": chosen format, "expires": timestamp, "probe": ffprobe result}
+        self.entries = {}
+        # Pending background refresh of each entry (scheduled on the supervisor loop)
+        self.timers = {}
+        # Lock protecting the entries and counters
+        self.lock = threading.Lock()
+        # Count the lookups served from the cache and the ones that ran yt-dlp
+        self.hits = 0
+        self.misses = 0
+
+    # Return the media URL and chosen format for a source, resolving it on a miss
+    def get(self, url, width, height, fps):
+        # Build the cache key
+        key = (url, width, height, fps)
+        # Look up a valid entry
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry["expires"] > time.time():
+                # Count and log the hit
+                self.hits += 1
+                logger.info(f"Resolved URL cache hit for {url} (hits {self.hits}, misses {self.misses})")
+                return entry["url"], entry["format"]
+            # Count and log the miss
+            self.misses += 1
+            logger.info(f"Resolved URL cache miss for {url} (hits {self.hits}, misses {self.misses})")
+        # Resolve the URL with yt-dlp and store it
+        return self.resolve(key)
+
+    # Resolve a cache key with yt-dlp, store the result and schedule its refresh
+    def resolve(self, key):
+        # Run yt-dlp
+        media_url, chosen = resolve_youtube_url(*key)
+        # Use the embedded expiry, or the default lifetime if there is none
+        expires = url_expiry(media_url) or time.time() + URL_CACHE_DEFAULT_TTL
+        # Refresh the entry shortly before it expires (or halfway through short lifetimes)
+        delay = max(expires - time.time() - URL_CACHE_REFRESH_MARGIN, (expires - time.time()) / 2, 1)
+        # Store the entry and replace its pending refresh
+        with self.lock:
+            self.entries[key] = {"url": media_url, "format": chosen, "expires": expires, "probe": None}
+            if key in self.timers:
+                self.timers[key].cancel()
+            self.timers[key] = SUPERVISOR.call_later(delay, self.refresh, key)
+        # Return the URL and chosen format
+        return media_url, chosen
+
+    # Return the ffprobe result for a source's cached media URL, probing it only once per resolution
+    def probe(self, url, width, height, fps):
+        # Build the cache key
+        key = (url, width, height, fps)
+        # Look up the entry and its cached result
+        with self.lock:
+            entry = self.entries.get(key)
+            # Nothing to probe if the entry is gone
+            if entry is None:
+                return None
+            # Return the cached result
+            if entry["probe"] is not None:
+                return entry["probe"]
+            media_url = entry["url"]
+        # Probe the media URL on first use, outside the lock
+        probe = probe_video(media_url)
+        # Store the result unless the entry was re-resolved meanwhile (its new URL is probed on first use)
+        with self.lock:
+            if self.entries.get(key) is entry:
+                entry["probe"] = probe
+        # Return the result
+        return probe
+
+    # Re-resolve a cache key in the background while an active stream still uses its source
+    def refresh(self, key):
+        # Drop the entry if no active stream relays this source anymore
+        if not any(stream.get("url") == key[0] and stream["active"] for stream in STREAMS.values()):
+            self.invalidate(key)
+            return
+        # Resolve the URL again, keeping the old entry if that fails
+        try:
+            self.resolve(key)
+            logger.info(f"Refreshed resolved URL for {key[0]}")
+        # Log the failure
+        except Exception as e:
+            logger.warning(f"Cannot refresh resolved URL for {key[0]}: {str(e)}")
+
+    # Remove a cache key so the next lookup runs yt-dlp
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+            # Cancel its pending refresh
+            timer = self.timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+
+# Shared cache of resolved YouTube URLs
+URL_CACHE = ResolvedUrlCache()
+
+# Probe the first video stream of a URL and return its codec name and frame rate, or None if probing fails
+def probe_video(input_url):
+    # Ask ffprobe for the codec and frame rate of the first video stream
+    cmd = [FFPROBE_PATH, "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=codec_name,r_frame_rate", "-of", "json", input_url]
+    # Run ffprobe and parse its output
+    try:
+        output = SUPERVISOR.check_output(cmd, PROBE_TIMEOUT)
+        stream = json.loads(output)["streams"][0]
+        # Convert the frame rate fraction (e.g. "30000/1001") to a number
+        num, _, den = stream.get("r_frame_rate", "0/1").partition("/")
+        rate = float(num) / float(den) if den and float(den) else float(num)
+        # Return the codec and frame rate
+        return stream.get("codec_name"), rate
+    # Treat any probing error as unknown
+    except Exception as e:
+        # Log the failure
+        logger.warning(f"Cannot probe {input_url[:80]}: {str(e)}")
+        return None
+
+# Return why a YouTube source must be transcoded, or None if it can be relayed with stream copy
+def remux_blocker(probe, width, height, fps):
+    # Scaling always needs the encoder
+    if width > 0 and height > 0:
+        return f"scaling to {width}x{height} requested"
+    # Unknown sources are transcoded to be safe
+    if probe is None:
+        return "source could not be probed"
+    # Unpack the probed codec and frame rate
+    codec, rate = probe
+    # Only codecs RTSP clients can play are copied
+    if codec not in REMUX_CODECS:
+        return f"codec {codec} is not in {', '.join(REMUX_CODECS)}"
+    # A different frame rate needs the encoder
+    if fps > 0 and abs(rate - fps) >= 0.5:
+        return f"source is {rate:.2f} fps, {fps} fps requested"
+    # The source can be copied
+    return None
+
+# Build the FFmpeg command that relays a YouTube stream URL (re-encoded, or stream-copied when remux is set)
+def build_youtube_ffmpeg_cmd(stream_key, input_url, width, height, fps, remux=False):
+    # Republish the first video stream as-is when remuxing
+    if remux:
+        return [FFMPEG_PATH] + PROGRESS_ARGS + ["-re", "-i", input_url, "-map", "0:v:0", "-c:v", "copy", "-an"] + output_args(stream_key)
+    # Define the FFmpeg command
+    cmd = [FFMPEG_PATH] + PROGRESS_ARGS + [
+        "-re", "-i", input_url,
+        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+        "-r", str(fps),
+    ]
+    # Add scaling filter if width/height specified
+    if width > 0 and height > 0:
+        cmd.extend(["-vf", f"scale={width}:{height},format=yuv420p"])
+    else:
+        cmd.extend(["-vf", "format=yuv420p"])
+    # Add output options
+    cmd.extend(["-an"] + output_args(stream_key))
+    # Return the FFmpeg command
+    return cmd
+
+# Define a child process owned by the supervisor, with the part of the Popen interface the engine uses
+class SupervisedProcess:
+    # Initialize the handle of a started asyncio process
+    def __init__(self, supervisor, args, process, stdin=None):
+        # Store the supervisor whose loop owns the process
+        self.supervisor = supervisor
+        # Store the command line
+        self.args = args
+        # Store the asyncio process
+        self.process = process
+        # Store the process id
+        self.pid = process.pid
+        # Unbuffered write end of the stdin pipe (window encoders only, written by the frame feeder)
+        self.stdin = stdin
+        # Exit code, set once the process exited
+        self.returncode = None
+        # Set once the process exited and its pipes are drained
+        self.exited = threading.Event()
+        # Last stderr lines, reported with the exit
+        self.stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+        # Callbacks for stdout lines, stderr lines and the exit
+        self.stdout_callbacks = []
+        self.stderr_callbacks = [lambda line: self.stderr_tail.append(line.rstrip())]
+        self.exit_callbacks = []
+        # Lock protecting the exit callbacks against the exit notification
+        self.lock = threading.Lock()
+        # Task watching the process, awaitable from the supervisor loop (returns the exit code)
+        self.task = None
+
+    # Register callbacks for stdout lines, stderr lines and the exit (they run on the supervisor loop and must not block)
+    def listen(self, on_stdout=None, on_stderr=None, on_exit=None):
+        # Add the line callbacks
+        if on_stdout is not None:
+            self.stdout_callbacks.append(on_stdout)
+        if on_stderr is not None:
+            self.stderr_callbacks.append(on_stderr)
+        # Add the exit callback, or run it right away if the process already exited
+        with self.lock:
+            exited = self.exited.is_set()
+            if on_exit is not None and not exited:
+                self.exit_callbacks.append(on_exit)
+        if on_exit is not None and exited:
+            on_exit(self)
+
+    # Return the exit code, or None while the process runs
+    def poll(self):
+        return self.returncode
+
+    # Wait for the process to exit and return its exit code
+    def wait(self, timeout=None):
+        # Raise like Popen.wait if it is still running after the timeout
+        if not self.exited.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        # Return the exit code
+        return self.returncode
+
+    # Ask the process to terminate
+    def terminate(self):
+        self.supervisor.signal(self, "terminate")
+
+    # Kill the process
+    def kill(self):
+        self.supervisor.signal(self, "kill")
+
+# Define the supervisor that runs all FFmpeg, ffprobe and yt-dlp children on one asyncio loop,
+# reading their pipes and reporting their exits without a thread per process
+class ProcessSupervisor:
+    # Initialize the supervisor (the loop starts on first use)
+    def __init__(self, workers=SUPERVISOR_WORKERS):
+        # Size of the pool for blocking calls
+        self.workers = workers
+        # Event loop, run on its own thread
+        self.loop = None
+        # Lock protecting the loop creation
+        self.lock = threading.Lock()
+        # Running processes
+        self.processes = set()
+
+    # Return the event loop, starting it on first use
+    def ensure_loop(self):
+        with self.lock:
+            if self.loop is None:
+                # Create the loop with a bounded pool for blocking calls
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(ThreadPoolExecutor(self.workers, thread_name_prefix="supervisor"))
+                # Before Python 3.12, asyncio waits for each child on its own thread on Linux unless it can use pidfds
+                if sys.version_info < (3, 12) and hasattr(asyncio, "PidfdChildWatcher") and self.pidfd_supported():
+                    watcher = asyncio.PidfdChildWatcher()
+                    watcher.attach_loop(loop)
+                    asyncio.set_child_watcher(watcher)
+                # Run the loop
+                threading.Thread(target=self.run, args=(loop,), name="supervisor", daemon=True).start()
+                self.loop = loop
+            return self.loop
+
+    # Check whether the kernel supports process file descriptors
+    def pidfd_supported(self):
+        try:
+            os.close(os.pidfd_open(os.getpid()))
+            return True
+        # Not Linux 5.3+ (or not Linux)
+        except (AttributeError, OSError):
+            return False
+
+    # Run the event loop
+    def run(self, loop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    # Schedule a coroutine on the loop from any thread and return its concurrent future
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.ensure_loop())
+
+    # Run a blocking function on the supervisor's worker pool after a delay, and return a cancellable future
+    def call_later(self, delay, function, *args):
+        return self.submit(self.delayed(delay, function, args))
+
+    # Wait for the delay, then run the function on the worker pool
+    async def delayed(self, delay, function, args):
+        await asyncio.sleep(delay)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, function, *args)
+        # Log failures, which would otherwise stay in the unread future
+        except Exception as e:
+            logger.error(f"Background task {function.__name__} failed: {str(e)}")
+
+    # Start a supervised process from any thread except the loop's (feed=True gives it a stdin pipe for frames)
+    def spawn(self, cmd, feed=False):
+        return self.submit(self.start_process(cmd, feed)).result()
+
+    # Start a supervised process on the loop and watch it
+    async def start_process(self, cmd, feed=False):
+        # Create the frame pipe: FFmpeg reads one end, the feeder thread writes the other (blocking, outside the loop)
+        read_fd = None
+        stdin = None
+        if feed:
+            read_fd, write_fd = os.pipe()
+            stdin = open(write_fd, "wb", buffering=0)
+        # Start the process with its output pipes read by the loop
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdin=read_fd if feed else subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                creationflags=CREATE_NO_WINDOW
+            )
+        # Close the frame pipe if the process cannot start
+        except Exception:
+            if stdin is not None:
+                stdin.close()
+            raise
+        # The child has its own copy of the read end
+        finally:
+            if read_fd is not None:
+                os.close(read_fd)
+        # Wrap the process and watch it
+        handle = SupervisedProcess(self, cmd, process, stdin)
+        self.processes.add(handle)
+        handle.task = asyncio.ensure_future(self.watch(handle))
+        # Return the handle
+        return handle
+
+    # Read a process's pipes until it exits, then notify its exit callbacks
+    async def watch(self, handle):
+        # Read both pipes line by line until the process closes them
+        await asyncio.gather(
+            self.read_lines(handle.process.stdout, handle.stdout_callbacks),
+            self.read_lines(handle.process.stderr, handle.stderr_callbacks)
+        )
+        # Get the exit code
+        returncode = await handle.process.wait()
+        # Mark the process as exited and take its exit callbacks
+        with handle.lock:
+            handle.returncode = returncode
+            handle.exited.set()
+            callbacks = list(handle.exit_callbacks)
+        self.processes.discard(handle)
+        # Notify the exit
+        for callback in callbacks:
+            try:
+                callback(handle)
+            # Keep a failing callback from stopping the others
+            except Exception as e:
+                logger.error(f"Exit handler for process {handle.pid} failed: {str(e)}")
+        # Return the exit code
+        return returncode
+
+    # Pass each line of a pipe to its callbacks
+    async def read_lines(self, reader, callbacks):
+        while True:
+            # Read the next line
+            try:
+                line = await reader.readline()
+            # Skip overlong lines
+            except ValueError:
+                continue
+            # Stop at the end of the pipe
+            if not line:
+                return
+            # Decode the line once and pass it on
+            text = line.decode(errors="replace")
+            for callback in list(callbacks):
+                try:
+                    callback(text)
+                # Keep a failing callback from stopping the reader
+                except Exception as e:
+                    logger.error(f"Output handler failed: {str(e)}")
+
+    # Send terminate or kill to a supervised process from any thread
+    def signal(self, handle, method):
+        self.ensure_loop().call_soon_threadsafe(self.send, handle, method)
+
+    # Send terminate or kill to a process that is still running
+    def send(self, handle, method):
+        if handle.returncode is None:
+            try:
+                getattr(handle.process, method)()
+            # It exited in the meantime
+            except ProcessLookupError:
+                pass
+
+    # Run a command to completion and return its stdout, from any thread except the loop's (yt-dlp, ffprobe)
+    def check_output(self, cmd, timeout=None):
+        return self.submit(self.output(cmd, timeout)).result()
+
+    # Run a command to completion on the loop and return its stdout
+    async def output(self, cmd, timeout=None):
+        # Start the command
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, creationflags=CREATE_NO_WINDOW
+        )
+        # Read its output, killing it after the timeout
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        # Raise like check_output if it failed
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout)
+        # Return the decoded output
+        return stdout.decode(errors="replace")
+
+# Shared supervisor of all child processes
+SUPERVISOR = ProcessSupervisor()
+
+# Define the health prober of the RTSP server: an RTSP OPTIONS handshake on the supervisor loop, cached between probes
+class RtspHealthProber:
+    # Initialize the prober (probing starts on first use)
+    def __init__(self, server=RTSP_SERVER, interval=RTSP_PROBE_INTERVAL, timeout=RTSP_PROBE_TIMEOUT, retry_interval=RTSP_PROBE_RETRY_INTERVAL):
+        # Address of the server ("host:port")
+        self.server = server
+        # Seconds between probes while the server is up, and while it is down
+        self.interval = interval
+        self.retry_interval = retry_interval
+        # Seconds to wait for an answer
+        self.timeout = timeout
+        # Result of the last probe: {"up", "code", "latency_ms", "error", "time"}, None before the first one
+        self.state = None
+        # Set once the first probe finished
+        self.probed = threading.Event()
+        # Future of the probing loop
+        self.future = None
+        # Lock protecting the loop start
+        self.lock = threading.Lock()
+        # Callbacks told (on the supervisor loop) when the server comes up or goes down
+        self.listeners = []
+
+    # Start the probing loop if it is not running
+    def start(self):
+        with self.lock:
+            if self.future is None or self.future.done():
+                self.future = SUPERVISOR.submit(self.run())
+
+    # Return the cached state (None before the first probe), waiting for the first probe only if wait is set (never on the GUI thread)
+    def status(self, wait=False):
+        # Make sure the server is being probed
+        self.start()
+        # Wait for the first result
+        if wait:
+            self.probed.wait(self.timeout + 1)
+        # Return the cached state
+        return self.state
+
+    # Return whether the server answered the last probe (cached, never probes)
+    def ready(self):
+        state = self.status()
+        return bool(state and state["up"])
+
+    # Return why the server is not ready, from the cached state
+    def error(self):
+        state = self.status()
+        return state["error"] if state else "not checked yet"
+
+    # Probe the server on the interval (more often while it is down)
+    async def run(self):
+        while True:
+            self.update(await self.probe())
+            await asyncio.sleep(self.interval if self.state["up"] else self.retry_interval)
+
+    # Cache a probe result and log changes of the server state
+    def update(self, state):
+        # Compare with the previous state
+        previous = self.state
+        self.state = state
+        self.probed.set()
+        # Log and report when the server comes up or goes down
+        if previous is None or previous["up"] != state["up"]:
+            if state["up"]:
+                logger.info(f"RTSP server at {self.server} is up ({state['latency_ms']} ms)")
+            else:
+                logger.warning(f"RTSP server at {self.server} is down: {state['error']}")
+            for listener in list(self.listeners):
+                try:
+                    listener(state)
+                # Keep a failing listener from stopping the probes
+                except Exception as e:
+                    logger.error(f"RTSP health listener failed: {str(e)}")
+
+    # Send one RTSP OPTIONS request and return the result
+    async def probe(self):
+        # Time the whole handshake
+        started = time.perf_counter()
+        try:
+            code = await asyncio.wait_for(self.handshake(), self.timeout)
+            return {"up": True, "code": code, "latency_ms": round((time.perf_counter() - started) * 1000, 2), "error": None, "time": time.time()}
+        # No answer in time
+        except asyncio.TimeoutError:
+            return {"up": False, "code": None, "latency_ms": None, "error": f"no answer within {self.timeout} s", "time": time.time()}
+        # Refused, reset, or not an RTSP server
+        except (OSError, ValueError) as e:
+            return {"up": False, "code": None, "latency_ms": None, "error": str(e) or type(e).__name__, "time": time.time()}
+
+    # Connect, send OPTIONS and return the status code of the answer (any RTSP answer, even 401, means the server is up)
+    async def handshake(self):
+        # Connect to the server
+        host, _, port = self.server.rpartition(":")
+        reader, writer = await asyncio.open_connection(host, int(port))
+        try:
+            # Send the request
+            writer.write(f"OPTIONS rtsp://{self.server}/ RTSP/1.0\r\nCSeq: 1\r\nUser-Agent: streampulse/{__version__}\r\n\r\n".encode())
+            await writer.drain()
+            # Read the status line (e.g. "RTSP/1.0 200 OK")
+            parts = (await reader.readline()).decode(errors="replace").split()
+            if len(parts) < 2 or not parts[0].startswith("RTSP/") or not parts[1].isdigit():
+                raise ValueError("not an RTSP answer")
+            return int(parts[1])
+        # Close the connection
+        finally:
+            writer.close()
+
+# Shared health prober of the RTSP server
+RTSP_HEALTH = RtspHealthProber()
+
+# Stop a child process and wait for it to exit: close its input so it can finish its output, then terminate and kill it on timeout
+def stop_process(process, timeout=ENCODER_STOP_TIMEOUT, graceful=True):
+    # Close the frame pipe, so FFmpeg reads end-of-file, writes its trailer and exits
+    if graceful and getattr(process, "stdin", None) is not None:
+        try:
+            process.stdin.close()
+        # The pipe is already broken
+        except OSError:
+            pass
+        # Wait for the clean exit
+        try:
+            process.wait(timeout=timeout)
+            return
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Process {process.pid} did not exit after its input was closed, terminating it")
+    # Ask the process to terminate
+    process.terminate()
+    # Wait for it to exit
+    try:
+        process.wait(timeout=timeout)
+    # Kill it if it did not exit in time
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+# Define one encoder process fed by a window stream, from its start request to its retirement
+class EncoderSession:
+    # Initialize the session for a process
+    def __init__(self, process, requested, warm):
+        # Store the FFmpeg process
+        self.process = process
+        # Monotonic time the encoder was requested (start or reconfigure)
+        self.requested = requested
+        # Whether the process came from the standby pool
+        self.warm = warm
+        # Set once the first frame is in the encoder pipe
+        self.first_frame = threading.Event()
+        # Time to first frame in milliseconds
+        self.ttff_ms = None
+        # Set when a newer encoder took over, so the feeder stops quietly
+        self.retired = threading.Event()
+        # Set once the feeder stopped writing to the encoder pipe, so the pipe can be closed safely
+        self.fed = threading.Event()
+
+    # Record the first frame written to the encoder
+    def mark_first_frame(self):
+        # Measure the time since the encoder was requested
+        self.ttff_ms = round((time.monotonic() - self.requested) * 1000, 1)
+        # Wake anyone waiting for the cut-over
+        self.first_frame.set()
+
+    # Stop feeding the encoder and stop its process
+    def retire(self):
+        # Tell the feeder to stop
+        self.retired.set()
+        # Stop the process once the feeder let go of its pipe, or terminate it if the feeder is stuck in a write
+        stop_process(self.process, graceful=self.fed.wait(ENCODER_STOP_TIMEOUT))
+
+# Define a pool of pre-spawned standby FFmpeg encoders, keyed by their command line
+class EncoderPool:
+    # Initialize an empty pool
+    def __init__(self, size=ENCODER_POOL_SIZE):
+        # Standby encoders kept per stream
+        self.size = size
+        # Standby (stream key, command, process) entries, oldest first
+        self.standby = []
+        # Time at which the standby encoders of each stopped stream are released
+        self.expires = {}
+        # Lock protecting the standby list
+        self.lock = threading.Lock()
+
+    # Spawn an encoder process for a command under the supervisor, with a stdin pipe for the frames
+    def spawn(self, cmd):
+        return SUPERVISOR.spawn(cmd, feed=True)
+
+    # Return a session for a command, using a standby encoder if one is ready, and warm a replacement
+    def acquire(self, stream_key, cmd):
+        # Record when the encoder was requested
+        requested = time.monotonic()
+        # Take a matching standby encoder that is still running
+        process = None
+        with self.lock:
+            # Keep the stream's standby encoders now that it runs again
+            self.expires.pop(stream_key, None)
+            for entry in self.standby:
+                if entry[1] == cmd and entry[2].poll() is None:
+                    self.standby.remove(entry)
+                    process = entry[2]
+                    break
+        # Remember whether the encoder was pre-spawned
+        warm = process is not None
+        # Otherwise spawn one now
+        if process is None:
+            process = self.spawn(cmd)
+        # Pre-spawn a replacement on the supervisor's workers for the next start or reconfigure with this geometry
+        # (not for file sinks, where a standby would truncate the file being written)
+        if STREAMS.get(stream_key, {}).get("sink", OUTPUT_SINK) in ("rtsp", "null"):
+            SUPERVISOR.call_later(0, self.warm, stream_key, cmd)
+        # Return the session
+        return EncoderSession(process, requested, warm)
+
+    # Spawn a standby encoder for a command, keeping at most size standby encoders per stream
+    def warm(self, stream_key, cmd):
+        with self.lock:
+            # Forget standby encoders that exited
+            self.standby = [entry for entry in self.standby if entry[2].poll() is None]
+            # Do nothing if this command already has a standby encoder
+            if any(entry[1] == cmd for entry in self.standby):
+                return
+        # Spawn the standby encoder (it waits for its first frame on stdin)
+        process = self.spawn(cmd)
+        with self.lock:
+            # Stop it if the stream was removed, or stopped without keeping its standby encoders, while it spawned
+            if not STREAMS.get(stream_key, {}).get("active") and stream_key not in self.expires:
+                evicted = [(stream_key, cmd, process)]
+            # Otherwise add it to the pool
+            else:
+                self.standby.append((stream_key, cmd, process))
+                # Evict the oldest standby encoders of this stream beyond the pool size
+                own = [entry for entry in self.standby if entry[0] == stream_key]
+                evicted = own[:max(0, len(own) - self.size)]
+                for entry in evicted:
+                    self.standby.remove(entry)
+        # Stop the evicted encoders
+        for entry in evicted:
+            stop_process(entry[2])
+
+    # Keep the standby encoders of a stopped stream for ttl seconds, then release them unless it started again
+    def expire(self, stream_key, ttl=ENCODER_STANDBY_TTL):
+        with self.lock:
+            deadline = self.expires[stream_key] = time.monotonic() + ttl
+        SUPERVISOR.call_later(ttl, self.release_expired, stream_key, deadline)
+
+    # Release the standby encoders of a stopped stream once its deadline passed
+    def release_expired(self, stream_key, deadline):
+        with self.lock:
+            # Do nothing if the stream started again or was stopped again later
+            if self.expires.get(stream_key) != deadline:
+                return
+            del self.expires[stream_key]
+        self.release(stream_key)
+
+    # Stop and forget the standby encoders of a stream (of all streams if stream_key is None)
+    def release(self, stream_key=None):
+        # Take the stream's entries out of the pool
+        with self.lock:
+            # Cancel the pending releases
+            if stream_key is None:
+                self.expires.clear()
+            else:
+                self.expires.pop(stream_key, None)
+            released = [entry for entry in self.standby if stream_key is None or entry[0] == stream_key]
+            self.standby = [entry for entry in self.standby if entry not in released]
+        # Stop them on the supervisor's workers, so the caller (e.g. the GUI thread) does not wait for the exits
+        for entry in released:
+            SUPERVISOR.call_later(0, stop_process, entry[2])
+        # Log the release
+        if released:
+            logger.info(f"Released {len(released)} standby encoders of {stream_key or 'all streams'}")
+
+# Shared pool of standby window encoders
+ENCODER_POOL = EncoderPool()
+
+# Define the Prometheus text exporter for the stream metrics
+class MetricsExporter:
+    # Metric name, help text, type and the stream field it is read from
+    STREAM_METRICS = [
+        ("streampulse_stream_active", "Whether the stream is active", "gauge", "active"),
+        ("streampulse_capture_fps", "Frames per second delivered to the encoder", "gauge", "fps"),
+        ("streampulse_pacing_drift_ms", "Pacing drift behind the frame schedule", "gauge", "drift_ms"),
+        ("streampulse_queue_depth", "Frames waiting for the encoder pipe", "gauge", "queue"),
+        ("streampulse_queue_dropped_total", "Frames dropped by the encoder queue", "counter", "queue_drop"),
+        ("streampulse_write_stall_ms", "Longest encoder pipe write", "gauge", "stall_ms"),
+        ("streampulse_first_frame_ms", "Time to first frame of the current encoder", "gauge", "ttff_ms"),
+        ("streampulse_encoder_speed", "Encoding speed relative to real time", "gauge", "speed"),
+        ("streampulse_encoder_fps", "Frames per second reported by FFmpeg", "gauge", "enc_fps"),
+        ("streampulse_encoder_bitrate_kbps", "Output bitrate reported by FFmpeg", "gauge", "bitrate_kbps"),
+        ("streampulse_encoder_alert", "Whether the encoder is falling behind real time", "gauge", "alert"),
+        ("streampulse_restarts_total", "Encoder restarts and retries", "counter", "restarts"),
+        ("streampulse_seconds_since_last_frame", "Seconds since the last frame reached the encoder", "gauge", "since_last_frame"),
+        ("streampulse_process_cpu_percent", "CPU use of the stream's FFmpeg process", "gauge", "cpu_percent"),
+        ("streampulse_process_rss_bytes", "Resident memory of the stream's FFmpeg process", "gauge", "rss_bytes"),
+    ]
+
+    # Initialize the exporter
+    def __init__(self):
+        # psutil handles by pid, kept so CPU percentages are measured between scrapes
+        self.processes = {}
+        # Handle of this process
+        self.own_process = psutil.Process()
+
+    # Return (CPU percent, RSS bytes) of a process, or None if it is gone
+    def process_usage(self, process):
+        try:
+            # Reuse the handle so cpu_percent measures since the last scrape
+            handle = self.processes.get(process.pid)
+            if handle is None:
+                handle = self.processes[process.pid] = psutil.Process(process.pid)
+            return handle.cpu_percent(None), handle.memory_info().rss
+        # The process exited
+        except psutil.Error:
+            self.processes.pop(process.pid, None)
+            return None
+
+    # Collect the fields of one stream without locking (plain reads of the shared dictionaries)
+    def stream_fields(self, stream):
+        # Combine the feeder metrics and the encoder progress
+        fields = dict(stream.get("metrics") or {}, **(stream.get("progress") or {}))
+        # Add the state and counters
+        fields["active"] = stream["active"]
+        fields["restarts"] = stream.get("restarts", 0)
+        # Add the time since the last frame
+        last_frame_time = stream.get("last_frame_time")
+        fields["since_last_frame"] = round(time.time() - last_frame_time, 3) if stream["active"] and last_frame_time else None
+        # Add the FFmpeg process usage
+        process = stream.get("process")
+        usage = self.process_usage(process) if process is not None and process.poll() is None else None
+        if usage:
+            fields["cpu_percent"], fields["rss_bytes"] = usage
+        # Return the fields
+        return fields
+
+    # Escape a label value as the Prometheus text format requires (backslash, double quote and newline)
+    def escape_label(self, value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    # Render all metrics in the Prometheus text format
+    def render(self):
+        # Snapshot the streams (the dictionary may change while we read)
+        streams = [(key, stream.get("type", ""), self.stream_fields(stream)) for key, stream in list(STREAMS.items())]
+        # Forget handles of processes that are no longer streamed
+        live = {stream.get("process").pid for stream in list(STREAMS.values()) if stream.get("process") is not None}
+        for pid in list(self.processes):
+            if pid not in live:
+                self.processes.pop(pid, None)
+        # Write each metric family
+        lines = []
+        for name, help_text, kind, field in self.STREAM_METRICS:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for key, stream_type, fields in streams:
+                value = fields.get(field)
+                if value is not None:
+                    lines.append(f'{name}{{stream="{self.escape_label(key)}",type="{self.escape_label(stream_type)}"}} {float(value)}')
+        # Add the StreamPulse process itself
+        lines += [
+            "# HELP streampulse_app_cpu_percent CPU use of the StreamPulse process", "# TYPE streampulse_app_cpu_percent gauge",
+            f"streampulse_app_cpu_percent {self.own_process.cpu_percent(None)}",
+            "# HELP streampulse_app_rss_bytes Resident memory of the StreamPulse process", "# TYPE streampulse_app_rss_bytes gauge",
+            f"streampulse_app_rss_bytes {self.own_process.memory_info().rss}",
+            "# HELP streampulse_app_threads Threads of the StreamPulse process", "# TYPE streampulse_app_threads gauge",
+            f"streampulse_app_threads {threading.active_count()}",
+        ]
+        # Add the cached health of the RTSP server
+        rtsp = RTSP_HEALTH.status()
+        if rtsp:
+            lines += [
+                "# HELP streampulse_rtsp_up Whether the RTSP server answered the last health probe", "# TYPE streampulse_rtsp_up gauge",
+                f"streampulse_rtsp_up {float(rtsp['up'])}",
+            ]
+            if rtsp["up"]:
+                lines += [
+                    "# HELP streampulse_rtsp_latency_ms RTSP OPTIONS round trip of the last health probe", "# TYPE streampulse_rtsp_latency_ms gauge",
+                    f"streampulse_rtsp_latency_ms {rtsp['latency_ms']}",
+                ]
+        # Return the exposition text
+        return "\n".join(lines) + "\n"
+
+# Define the HTTP handler that serves the exporter on /metrics
+class MetricsHandler(BaseHTTPRequestHandler):
+    # Exporter shared by all requests
+    exporter = None
+
+    # Serve a GET request
+    def do_GET(self):
+        # Only /metrics is served
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        # Render and send the metrics
+        body = self.exporter.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Keep scrapes out of the application log
+    def log_message(self, format, *args):
+        pass
+
+# Start the metrics endpoint on its own daemon thread and return the server
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    # Share one exporter between requests so CPU percentages span scrapes
+    MetricsHandler.exporter = MetricsExporter()
+    # Create the server
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    # Serve in the background
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Log the endpoint
+    logger.info(f"Metrics endpoint listening on http://{host}:{server.server_address[1]}/metrics")
+    # Return the server
+    return server
+
+# Streams that cannot be removed
+PROTECTED_STREAMS = ["radar", "mystream2", "fallback"]
+
+# Check that a value is an integer in a range (booleans are not accepted as integers)
+def int_in_range(value, low, high):
+    return isinstance(value, int) and not isinstance(value, bool) and low <= value <= high
+
+# Characters allowed in a stream key, so it can be used in control API paths and RTSP URLs
+STREAM_KEY_PATTERN = r"[A-Za-z0-9_.-]+"
+
+# Optional stream keys accepted when adding a stream, with the check of each value (state keys such as active or process are not accepted)
+STREAM_OPTIONS = {
+    "key": lambda value: isinstance(value, str) and re.fullmatch(STREAM_KEY_PATTERN, value) is not None,
+    "backend": lambda value: value in ("dxcam", "synthetic", "file"),
+    "sink": lambda value: isinstance(value, str) and value != "",
+    "capture_mode": lambda value: value in ("region", "monitor"),
+    "capture_process": lambda value: isinstance(value, bool),
+    "preconvert": lambda value: isinstance(value, bool),
+    "skip_static": lambda value: isinstance(value, bool),
+    "remux": lambda value: isinstance(value, bool),
+    "autostart": lambda value: isinstance(value, bool),
+    "queue_latency": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool) and 0 < value <= 10,
+    "source_size": lambda value: isinstance(value, (list, tuple)) and len(value) == 2 and all(int_in_range(v, 2, 7680) for v in value),
+}
+
+# Derive a URL-safe stream key from a source: the video id of a YouTube URL, the last path part of other URLs, or the window name
+def stream_key_from_source(source):
+    # Use the "v" query parameter or the last path part of a URL
+    if source.startswith("http"):
+        url = urlsplit(source)
+        source = (parse_qs(url.query).get("v") or [url.path.rstrip("/").split("/")[-1] or url.netloc])[0]
+    # Replace the characters that are not URL-safe
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", source).strip("_") or "stream"
+
+# Check the settings and optional keys of a new stream, raising ValueError for anything not accepted
+def validate_stream_settings(source, width, height, fps, lock_position, options):
+    # Check the source and the common settings (same ranges as the GUI)
+    if not isinstance(source, str):
+        raise ValueError("The source must be a string")
+    if not int_in_range(width, 0, 3840) or not int_in_range(height, 0, 2160):
+        raise ValueError("Width must be 0-3840 and height 0-2160 (0 for native)")
+    if not int_in_range(fps, 1, 60):
+        raise ValueError("FPS must be an integer from 1 to 60")
+    if not isinstance(lock_position, bool):
+        raise ValueError("lock_position must be true or false")
+    # Check the optional keys
+    for name, value in options.items():
+        if name not in STREAM_OPTIONS:
+            raise ValueError(f"Unknown stream option '{name}'")
+        if not STREAM_OPTIONS[name](value):
+            raise ValueError(f"Invalid value for '{name}': {value!r}")
+
+# Define the capture/relay engine that runs the streams, shared by the GUI and the headless daemon
+class StreamEngine:
+    # Initialize the engine
+    def __init__(self):
+        # Lock serializing control requests (start, stop, add, remove)
+        self.lock = threading.RLock()
+        # Callbacks told about stream events (stream key, event): "exited", "restarting", "failed"
+        self.listeners = []
+        # Start probing the RTSP server in the background, so stream starts find a cached result
+        RTSP_HEALTH.start()
+
+    # Check if the RTSP server (MediaMTX) answered the last background health probe
+    def rtsp_server_ready(self):
+        return RTSP_HEALTH.ready()
+
+    # Start a stream
+    def start_stream(self, stream_key):
+        with self.lock:
+            # Get the stream dictionary
+            stream = STREAMS[stream_key]
+            # Do nothing if the stream is already running
+            if stream["active"]:
+                return
+            # Check if MediaMTX is needed and accepting connections
+            if stream.get("sink", OUTPUT_SINK) == "rtsp" and not self.rtsp_server_ready():
+                # Refuse to start without MediaMTX
+                raise RuntimeError(f"MediaMTX is not answering on {RTSP_HEALTH.server} ({RTSP_HEALTH.error()}). Start it manually or via batch file with admin rights.")
+            # Import the capture modules of window streams first, so a missing module leaves the stream inactive
+            if stream["type"] == "window":
+                load_capture_modules()
+            # Mark the stream as active and streaming before its threads check the flag (they may mark it failed)
+            stream["active"] = True
+            stream["status"] = "Streaming"
+            # Start window capture if type is window
+            if stream["type"] == "window":
+                # Call start_window_capture with stream parameters
+                self.start_window_capture(stream_key, stream["name"], stream["width"], stream["height"], stream["fps"])
+            # Start YouTube stream if type is youtube
+            elif stream["type"] == "youtube":
+                # Call start_youtube_stream with stream parameters
+                self.start_youtube_stream(stream_key, stream["url"], stream["width"], stream["height"], stream["fps"])
+            # Log the stream start
+            logger.info(f"Started stream {stream_key} at rtsp://{RTSP_SERVER}/{stream_key}")
+
+    # Define a method to log FFmpeg error lines
+    def log_ffmpeg_output(self, stream_key, line):
+        # Strip the line
+        text = line.strip()
+        # Check if the line contains an error
+        if "error" in text.lower():
+            # Log the error
+            logger.error(f"FFmpeg error for {stream_key}: {text}")
+
+    # Return a line handler that turns FFmpeg -progress output into live encoder metrics
+    def read_ffmpeg_progress(self, ffmpeg_process, stream_key, stream):
+        # Create the progress parser
+        progress = EncoderProgress()
+        # Whether the stream is currently flagged as overloaded
+        state = {"alerting": False}
+
+        # Handle one progress line from FFmpeg stdout
+        def on_line(line):
+            # Parse the line and wait until a block is complete
+            metrics = progress.parse(line)
+            if metrics is None:
+                return
+            # Ignore encoders that were replaced (make-before-break) or stopped
+            if stream["process"] is not ffmpeg_process:
+                return
+            # Flag sustained speeds below real time (variable-rate streams skip frames on purpose, so they are not checked)
+            slow = (metrics["speed_measured"] and metrics["speed"] < SPEED_ALERT_THRESHOLD
+                    and not stream.get("skip_static", SKIP_STATIC_FRAMES))
+            # Log when the encoder falls behind and when it recovers
+            if slow and not state["alerting"]:
+                logger.warning(f"Encoder for {stream_key} is falling behind: speed {metrics['speed']}x over {PROGRESS_SPEED_WINDOW} s")
+            elif state["alerting"] and not slow:
+                logger.info(f"Encoder for {stream_key} recovered: speed {metrics['speed']}x")
+            state["alerting"] = slow
+            # Record output progress as the last frame (YouTube relays have no frame feeder)
+            if stream["type"] == "youtube" and metrics["out_time_s"] != stream.get("progress", {}).get("out_time_s"):
+                stream["last_frame_time"] = time.time()
+            # Publish the encoder metrics for the status table
+            stream["progress"] = dict(metrics, alert=slow)
+
+        # Return the handler
+        return on_line
+
+    # Attach the error log, the progress reader and the exit handler to a supervised FFmpeg process
+    def watch_ffmpeg(self, ffmpeg_process, stream_key, stream):
+        ffmpeg_process.listen(
+            self.read_ffmpeg_progress(ffmpeg_process, stream_key, stream),
+            lambda line: self.log_ffmpeg_output(stream_key, line),
+            lambda process: self.process_exited(stream_key, stream, process)
+        )
+
+    # Tell the listeners about a stream event
+    def notify(self, stream_key, event):
+        for listener in list(self.listeners):
+            try:
+                listener(stream_key, event)
+            # Keep a failing listener from stopping the others
+            except Exception as e:
+                logger.error(f"Stream event listener failed: {str(e)}")
+
+    # Record the exit of a stream's FFmpeg process as soon as the supervisor reports it
+    # (the capture monitor or the relay then applies the restart policy)
+    def process_exited(self, stream_key, stream, process):
+        # Ignore encoders that were replaced (make-before-break) or stopped
+        if not stream["active"] or stream["process"] is not process:
+            return
+        # Record the exit code and the last stderr lines
+        stream["last_exit"] = {"code": process.returncode, "stderr": list(process.stderr_tail), "time": time.time()}
+        # Log them
+        logger.warning(f"FFmpeg for {stream_key} exited with code {process.returncode}: {' | '.join(process.stderr_tail) or 'no output'}")
+        # Notify the listeners
+        self.notify(stream_key, "exited")
+
+    # Mark an active stream whose process exited as failed
+    def mark_failed(self, stream_key, stream):
+        # Mark stream as inactive
+        stream["active"] = False
+        # Clear the process reference
+        stream["process"] = None
+        # Update the status to failed
+        stream["status"] = "Failed"
+        # Log the failure
+        logger.warning(f"Stream {stream_key} failed")
+        # Notify the listeners
+        self.notify(stream_key, "failed")
+
+    # Start capturing a window stream
+    def start_window_capture(self, stream_key, window_name, width, height, fps):
+        # Keep the stream dictionary, so a removed stream does not break the capture threads
+        stream = STREAMS[stream_key]
+        # Define a function to feed frames to FFmpeg
+        def feed_frames(capture, encoder, stream_key, fps, captured_width, captured_height, preconvert, skip_static):
+            # Initialize frame counter
+            frame_count = 0
+            # Create the bounded queue between this capture loop and the pipe writer
+            queue = FrameQueue(fps, stream.get("queue_latency", FRAME_QUEUE_LATENCY))
+            # Create the pre-pipe converter if frames are converted before FFmpeg (with enough buffers for every queued frame)
+            converter = FrameConverter(captured_width, captured_height, width, height, queue.capacity + 2) if preconvert else None
+            # Create the change detector if unchanged frames are skipped
+            detector = FrameChangeDetector() if skip_static else None
+            # Count the frame slots written to FFmpeg and the ones skipped as unchanged
+            sent = 0
+            skipped = 0
+            # Record when a frame was last sent, for the keepalive of static windows
+            last_sent_time = 0
+            # Create a transport that writes frames into the unbuffered FFmpeg stdin pipe
+            transport = FrameTransport(encoder.process.stdin)
+            # Create a pacer that schedules frames on absolute deadlines
+            pacer = FramePacer(fps)
+
+            # Write queued frames into the pipe, so a slow encoder never blocks capture
+            def write_frames():
+                # Continue until the capture loop closes the queue
+                while True:
+                    # Wait for the next frame
+                    entry = queue.get(timeout=0.5)
+                    # Stop once the queue is closed and drained
+                    if entry is None:
+                        if queue.closed:
+                            return
+                        continue
+                    # Write the frame once per due slot without an intermediate copy
+                    frame, count = entry
+                    try:
+                        for _ in range(count):
+                            transport.write(frame)
+                    # Stop writing if the encoder pipe is gone
+                    except Exception as e:
+                        # Log the error unless the stream was stopped or the encoder retired on purpose
+                        if stream["active"] and not queue.closed and not encoder.retired.is_set():
+                            logger.error(f"Error feeding frame for {stream_key}: {str(e)}")
+                        return
+                    # Record when the last frame reached the encoder
+                    stream["last_frame_time"] = time.time()
+                    # Report the time to first frame of this encoder
+                    if not encoder.first_frame.is_set():
+                        encoder.mark_first_frame()
+                        logger.info(f"First frame for {stream_key} after {encoder.ttff_ms} ms ({'standby' if encoder.warm else 'new'} encoder)")
+
+            # Collect the pacing, queue and skip stats for the status table
+            def collect_metrics():
+                # Start from the pacing stats
+                metrics = dict(pacer.stats(), queue=queue.depth(), queue_drop=queue.dropped, stall_ms=round(transport.max_write_time * 1000, 1), ttff_ms=encoder.ttff_ms)
+                # Add the sent/skipped split when skipping unchanged frames
+                if detector is not None:
+                    metrics.update(sent=sent, skipped=skipped)
+                # Return the metrics
+                return metrics
+
+            # Start the pipe writer
+            writer = threading.Thread(target=write_frames, daemon=True)
+            writer.start()
+            # Keep the last frame so it can be repeated when capture has nothing new
+            last_frame = None
+            # Record the last logging time
+            last_log_time = time.time()
+            # Frame shape the encoder was configured for
+            expected_shape = (captured_height, captured_width)
+            # Continue while stream is active and the encoder and writer are running (the camera may be swapped meanwhile)
+            while stream["active"] and not encoder.retired.is_set() and encoder.process.poll() is None and writer.is_alive():
+                # Wait for the next frame deadline and get how many frames are due
+                due = pacer.wait()
+                # Get the current camera, which is replaced when the window moves
+                camera = capture["camera"]
+                # Get the latest frame from the camera while it is capturing
+                frame = camera.get_latest_frame() if camera is not None and camera.is_capturing else None
+                # Ignore frames of another size while the encoder is being reconfigured
+                if frame is not None and frame.shape[:2] != expected_shape:
+                    frame = None
+                # Skip unchanged frames (and missing ones) until the keepalive is due
+                if detector is not None and last_frame is not None and (frame is None or not detector.changed(frame)):
+                    # Count the skipped slots and wait for the next deadline
+                    if time.monotonic() - last_sent_time < STATIC_KEEPALIVE_INTERVAL:
+                        skipped += due
+                        stream["metrics"] = collect_metrics()
+                        continue
+                    # Resend the previous frame as the keepalive
+                    frame = None
+                # Record the first frame in the change detector
+                elif detector is not None and frame is not None and last_frame is None:
+                    detector.changed(frame)
+                # Downscale and convert the frame to yuv420p before the pipe
+                if frame is not None and converter is not None:
+                    frame = converter.convert(frame)
+                # Repeat the previous frame if capture produced nothing new
+                if frame is None:
+                    # Nothing to repeat before the first frame, so restart the schedule
+                    if last_frame is None:
+                        pacer.reset()
+                        continue
+                    # Use the previous frame and count it as a duplicate
+                    frame = last_frame
+                    pacer.duplicated += 1
+                # Frames are timestamped on arrival when skipping, so catch-up repeats add nothing
+                if detector is not None:
+                    skipped += due - 1
+                    due = 1
+                # Hand the frame to the writer, dropping the oldest queued frame if the encoder is behind
+                queue.put(frame, due)
+                # Remember the frame for repeats
+                last_frame = frame
+                last_sent_time = time.monotonic()
+                # Increment the frame counters
+                frame_count += due
+                sent += due
+                # Publish the pacing, queue and skip stats for the status table
+                stream["metrics"] = collect_metrics()
+                # Log every 5 seconds
+                if time.time() - last_log_time >= 5:
+                    # Log the frame count, frame size, bytes copied per frame and stats
+                    logger.info(f"Streaming {stream_key}: frame {frame_count}, size: {frame.nbytes} bytes, copied: {transport.copied_per_frame():.0f} bytes/frame, {format_metrics(stream['metrics'])}")
+                    # Update the last log time
+                    last_log_time = time.time()
+            # Stop the writer once the queued frames are written
+            queue.close()
+            writer.join(ENCODER_STOP_TIMEOUT)
+            # Let the pipe be closed unless the writer is still blocked on the encoder
+            if not writer.is_alive():
+                encoder.fed.set()
+
+        # Define a function to monitor the window and stream
+        def monitor_and_stream():
+            # Initialize camera and encoder variables
+            camera = None
+            encoder = None
+            current_output_idx = None
+            initial_region = None
+            captured_width = None
+            captured_height = None
+            last_restart_time = 0
+            debounce_delay = 0.5  # Delay to prevent rapid restarts
+            # Consecutive encoder failures
+            failures = 0
+            # Consecutive captures that stopped on their own, and when the current one was attached
+            capture_failures = 0
+            capture_started = 0
+            # Current camera, shared with the frame feeder so moves do not restart it
+            capture = {"camera": None}
+            # Log the start of window capture
+            logger.info(f"Starting window capture for {stream_key}: {window_name}")
+            # Create the capture backend configured for this stream
+            try:
+                backend = create_capture_backend(stream)
+            # Give up if the backend cannot be created
+            except Exception as e:
+                # Log the error
+                logger.error(f"Cannot create capture backend for {stream_key}: {str(e)}")
+                # Mark the stream as failed and exit the monitoring thread
+                self.mark_failed(stream_key, stream)
+                return
+            # Subscribe to the window through the shared tracker instead of polling all windows here
+            tracker = get_window_tracker(backend)
+            subscription = tracker.subscribe(window_name)
+            # Use the shared monitor topology cache instead of querying the monitors every tick
+            topology = get_monitor_topology(backend)
+            # Check whether this stream grabs its monitor once and slices its region
+            per_monitor = stream.get("capture_mode", CAPTURE_MODE) == "monitor"
+            # Check whether frames are converted to yuv420p before the pipe
+            preconvert = stream.get("preconvert", PRE_PIPE_CONVERT)
+            # Check whether unchanged frames are skipped instead of encoded
+            skip_static = stream.get("skip_static", SKIP_STATIC_FRAMES)
+            # Check whether the capture runs in a worker process
+            in_process = stream.get("capture_process", CAPTURE_PROCESS)
+            # Continue while the stream is active
+            while stream["active"]:
+                # Try to monitor and stream
+                try:
+                    # Get the latest window capture rectangle from the tracker
+                    window = subscription.geometry
+                    # Check if the window was found
+                    if not window:
+                        # Log a warning if window not found
+                        logger.warning(f"Window '{window_name}' not found. Retrying...")
+                        # Wait before retrying (returns early if the window appears)
+                        subscription.wait(1)
+                        # Skip to next iteration
+                        continue
+                    # Restart the encoder right away if it exited on its own
+                    if encoder is not None and encoder.process.poll() is not None and not encoder.retired.is_set():
+                        # Count consecutive failures (an encoder that ran for a while starts a new count)
+                        failures = 1 if time.monotonic() - encoder.requested >= RESTART_RESET_WINDOW else failures + 1
+                        # Give up after too many
+                        if failures > RESTART_MAX_ATTEMPTS:
+                            self.mark_failed(stream_key, stream)
+                            break
+                        # Log and count the restart
+                        logger.warning(f"Restarting FFmpeg for {stream_key} ({failures}/{RESTART_MAX_ATTEMPTS})")
+                        stream["restarts"] = stream.get("restarts", 0) + 1
+                        self.notify(stream_key, "restarting")
+                        # Wait before repeated restarts
+                        if failures > 1:
+                            time.sleep(RESTART_DELAY)
+                        # Start a new encoder below
+                        encoder = None
+                    # Attach to a new capture if the current one stopped on its own (e.g. its worker process died)
+                    if camera is not None and not camera.is_capturing:
+                        # Count consecutive failures (a capture that ran for a while starts a new count)
+                        capture_failures = 1 if time.monotonic() - capture_started >= RESTART_RESET_WINDOW else capture_failures + 1
+                        # Give up after too many
+                        if capture_failures > RESTART_MAX_ATTEMPTS:
+                            logger.error(f"Capture for {stream_key} keeps stopping, giving up")
+                            self.mark_failed(stream_key, stream)
+                            break
+                        # Detach from the stopped capture and attach to a new one below
+                        logger.warning(f"Capture for {stream_key} stopped, restarting it ({capture_failures}/{RESTART_MAX_ATTEMPTS})")
+                        camera.stop()
+                        camera = None
+                        capture["camera"] = None
+                    # Get window position and size (already adjusted for the border)
+                    rx, ry, r_width, r_height = window
+                    # Find the monitor containing the window from the shared topology cache
+                    target_monitor_idx, monitor = topology.locate(rx, ry)
+                    # Calculate capture region within monitor bounds
+                    region_left = max(rx, monitor.x)
+                    region_top = max(ry, monitor.y)
+                    region_right = min(region_left + r_width, monitor.x + monitor.width)
+                    region_bottom = min(region_top + r_height, monitor.y + monitor.height)
+                    # Calculate captured dimensions
+                    new_captured_width = region_right - region_left
+                    new_captured_height = region_bottom - region_top
+                    # Define the capture region relative to monitor
+                    region = (region_left - monitor.x, region_top - monitor.y, 
+                             region_right - monitor.x, region_bottom - monitor.y)
+                    # Set the output index
+                    output_idx = target_monitor_idx
+                    # Keep the locked region and monitor once capture has started
+                    if stream["lock_position"] and initial_region is not None:
+                        region = initial_region
+                        output_idx = current_output_idx
+                        new_captured_width = region[2] - region[0]
+                        new_captured_height = region[3] - region[1]
+                    # Check what changed since the last check
+                    size_changed = new_captured_width != captured_width or new_captured_height != captured_height
+                    monitor_changed = current_output_idx != output_idx
+                    region_changed = region != initial_region
+                    # Only a size change needs a new encoder; moves are handled on the capture side
+                    should_restart = size_changed and (time.time() - last_restart_time > debounce_delay)
+                    # Log debug info if DEBUG_MODE is enabled
+                    if DEBUG_MODE:
+                        logger.debug(f"Window {window_name} pos: {window}, region: {region}")
+                    # Slice a different part of the same monitor grab if only the region moved
+                    if per_monitor and camera is not None and not monitor_changed and region_changed:
+                        camera.crop = region
+                        logger.info(f"Moved {stream_key} to region {region} of output {output_idx}")
+                        # Set the initial region
+                        initial_region = region
+                    # Move the camera to the new monitor or region if needed
+                    elif camera is None or monitor_changed or region_changed:
+                        if camera:
+                            # Detach from the previous capture
+                            camera.stop()
+                        # Attach to the capture of this region (or monitor), shared with other streams capturing it
+                        camera = acquire_grabber(backend, output_idx, region, fps, per_monitor, in_process)
+                        capture_started = time.monotonic()
+                        output_idx = camera.output_idx
+                        logger.info(f"Capturing {stream_key} on output {output_idx} with region {region} (shared by {camera.grabber.users} stream(s))")
+                        # Hand the camera to the running frame feeder
+                        capture["camera"] = camera
+                        # Set the initial region
+                        initial_region = region
+                        # Update the current output index
+                        current_output_idx = output_idx
+                    # Restart FFmpeg if needed
+                    if encoder is None or should_restart:
+                        # Keep the running encoder until the new one has its first frame
+                        previous = encoder
+                        if previous:
+                            # Count the restart
+                            stream["restarts"] = stream.get("restarts", 0) + 1
+                            # Log the controlled encoder reconfiguration
+                            logger.info(f"Reconfiguring FFmpeg for {stream_key}: {captured_width}x{captured_height} -> {new_captured_width}x{new_captured_height}")
+                        # Define the FFmpeg command
+                        cmd = build_window_ffmpeg_cmd(stream_key, new_captured_width, new_captured_height, width, height, fps, preconvert, skip_static)
+                        # Take a standby encoder for this command from the pool, or start one
+                        encoder = ENCODER_POOL.acquire(stream_key, cmd)
+                        # Store the process in the STREAMS dictionary
+                        stream["process"] = encoder.process
+                        # Log its errors, read its progress and report its exit on the supervisor loop
+                        self.watch_ffmpeg(encoder.process, stream_key, stream)
+                        # Wake this loop as soon as the encoder exits
+                        encoder.process.listen(on_exit=lambda process: subscription.changed.set())
+                        # Start a thread to feed frames to FFmpeg
+                        threading.Thread(target=feed_frames, args=(capture, encoder, stream_key, fps, new_captured_width, new_captured_height, preconvert, skip_static), daemon=True).start()
+                        # Log the FFmpeg start
+                        logger.info(f"Started FFmpeg for {stream_key} with region {region}, size {new_captured_width}x{new_captured_height} ({'standby' if encoder.warm else 'new'} encoder)")
+                        # Cut over: retire the old encoder once the new one has its first frame
+                        if previous:
+                            encoder.first_frame.wait(ENCODER_CUTOVER_TIMEOUT)
+                            previous.retire()
+                        # Update captured dimensions
+                        captured_width = new_captured_width
+                        captured_height = new_captured_height
+                        # Update the last restart time
+                        last_restart_time = time.time()
+                    # Wait for a geometry change or the next check
+                    subscription.wait(0.5)
+                # Handle exceptions in monitoring
+                except Exception as e:
+                    # Log the error
+                    logger.error(f"Error in window capture for {stream_key}: {str(e)}")
+                    # Mark the stream as failed unless it was stopped meanwhile, and break the loop
+                    if stream["active"]:
+                        self.mark_failed(stream_key, stream)
+                    break
+            # Stop tracking the window
+            tracker.unsubscribe(subscription)
+            # Clean up camera if it exists
+            if camera:
+                # Detach from the shared capture
+                camera.stop()
+                # Log the stop
+                logger.info(f"Stopped capture for {stream_key}")
+            # Clean up FFmpeg if it exists
+            if encoder:
+                # Stop the feeder and terminate the FFmpeg process
+                encoder.retire()
+                # Log the stop
+                logger.info(f"Stopped FFmpeg for {stream_key}")
+
+        # Start the monitoring thread
+        threading.Thread(target=monitor_and_stream, daemon=True).start()
+
+    # Start streaming a YouTube video
+    def start_youtube_stream(self, stream_key, url, width, height, fps):
+        # Keep the stream dictionary, so a removed stream does not break the relay
+        stream = STREAMS[stream_key]
+        # Run the relay on the supervisor loop
+        SUPERVISOR.submit(self.relay_youtube(stream_key, stream, url, width, height, fps))
+
+    # Relay a YouTube video, restarting FFmpeg when it fails
+    async def relay_youtube(self, stream_key, stream, url, width, height, fps):
+        # Get the supervisor loop, whose workers run the blocking URL lookups
+        loop = asyncio.get_running_loop()
+        # Count consecutive failures
+        failures = 0
+        # Log the start attempt
+        logger.info(f"Starting YouTube stream {stream_key}: {url}")
+        # Continue while active (failures beyond the restart policy break out)
+        while stream["active"]:
+            # Try to start the stream
+            try:
+                # Get the URL of the rendition matching the stream's size and frame rate (cached, or from yt-dlp)
+                m3u8_url, chosen = await loop.run_in_executor(None, URL_CACHE.get, url, width, height, fps)
+                # Log the chosen format
+                logger.info(f"Selected format {chosen['format_id']} for {stream_key}: {chosen['vcodec']} {chosen['width']}x{chosen['height']} @ {chosen['fps']} fps, {chosen['tbr']} kbps")
+                # Check whether the source can be relayed with stream copy instead of transcoding
+                remux = False
+                if stream.get("remux", YOUTUBE_REMUX):
+                    # Probe the source codec and frame rate (once per resolved URL)
+                    probe = await loop.run_in_executor(None, URL_CACHE.probe, url, width, height, fps)
+                    reason = remux_blocker(probe, width, height, fps)
+                    remux = reason is None
+                    # Log the chosen mode
+                    if remux:
+                        logger.info(f"Relaying {stream_key} with stream copy ({probe[0]}, {probe[1]:.2f} fps)")
+                    else:
+                        logger.info(f"Transcoding {stream_key}: {reason}")
+                # Stop if the stream was stopped while resolving
+                if not stream["active"]:
+                    break
+                # Define the FFmpeg command
+                cmd = build_youtube_ffmpeg_cmd(stream_key, m3u8_url, width, height, fps, remux)
+                # Start the FFmpeg process under the supervisor
+                process = await SUPERVISOR.start_process(cmd)
+                # Store the process in the STREAMS dictionary
+                stream["process"] = process
+                # Log its errors and read its progress
+                self.watch_ffmpeg(process, stream_key, stream)
+                # Record when the relay started
+                started = time.time()
+                # Wait for the process to exit (its exit was already recorded by process_exited)
+                returncode = await process.task
+                # Check the return code
+                if returncode != 0 and stream["active"]:
+                    # Count consecutive failures (a relay that ran for a while starts a new count)
+                    failures = 1 if time.time() - started >= RESTART_RESET_WINDOW else failures + 1
+                    # Give up after too many
+                    if failures > RESTART_MAX_ATTEMPTS:
+                        break
+                    # Log a warning if failed
+                    logger.warning(f"Stream {stream_key} failed, retrying ({failures}/{RESTART_MAX_ATTEMPTS})")
+                    # Count the restart
+                    stream["restarts"] = stream.get("restarts", 0) + 1
+                    self.notify(stream_key, "restarting")
+                    # A relay that fails right away likely has a bad URL, so resolve it again on retry
+                    if time.time() - started < URL_FAILURE_WINDOW:
+                        URL_CACHE.invalidate((url, width, height, fps))
+                    # Wait before repeated retries (the first one is immediate)
+                    if failures > 1:
+                        await asyncio.sleep(RESTART_DELAY)
+                else:
+                    # Break if successful or stopped
+                    break
+            # Handle exceptions during streaming
+            except Exception as e:
+                # Log the error
+                logger.error(f"Error starting YouTube stream {stream_key}: {str(e)}")
+                # Break the loop
+                break
+        # Mark the stream as failed if it is still supposed to run
+        if stream["active"]:
+            self.mark_failed(stream_key, stream)
+
+    # Stop a stream
+    def stop_stream(self, stream_key):
+        with self.lock:
+            # Get the stream dictionary
+            stream = STREAMS[stream_key]
+            # Take the process and mark the stream as inactive first, so the exit is not reported as a failure
+            process = stream["process"]
+            stream["process"] = None
+            stream["active"] = False
+            # Terminate the FFmpeg relay if it exists (window encoders are stopped by their capture thread, which closes their input)
+            if process and process.stdin is None:
+                process.terminate()
+            # Keep the stream's standby encoders for a while, in case it is started again
+            ENCODER_POOL.expire(stream_key)
+            # Clear the live metrics
+            stream["metrics"] = {}
+            stream["progress"] = {}
+            # Update the stream status
+            stream["status"] = "Inactive"
+            # Log the stop
+            logger.info(f"Stopped stream {stream_key}")
+
+    # Add a new stream from a window name or YouTube URL and return its key
+    def add_stream(self, source, width=0, height=0, fps=30, lock_position=False, **options):
+        with self.lock:
+            # Reject invalid settings and unknown keys
+            validate_stream_settings(source, width, height, fps, lock_position, options)
+            # Strip the source
+            source = source.strip()
+            # Check if source is empty
+            if not source:
+                raise ValueError("Please enter a source!")
+            # Determine the stream key from the source
+            stream_key = options.pop("key", None) or stream_key_from_source(source)
+            # Check if stream key already exists
+            if stream_key in STREAMS:
+                raise ValueError("Stream already exists!")
+            # Add a YouTube stream if source is a URL
+            if source.startswith("http"):
+                stream = {"type": "youtube", "url": source, "lock_position": False}
+            # Add a window stream otherwise
+            else:
+                stream = {"type": "window", "name": source, "lock_position": lock_position}
+            # Add the common fields and the optional stream keys (backend, sink, capture_mode, ...)
+            stream.update({"active": False, "process": None, "status": "Inactive", "width": width, "height": height, "fps": fps}, **options)
+            STREAMS[stream_key] = stream
+            # Log the addition
+            logger.info(f"Added stream {stream_key}")
+            # Return the key
+            return stream_key
+
+    # Remove a stream
+    def remove_stream(self, stream_key):
+        with self.lock:
+            # Check if stream is protected
+            if stream_key in PROTECTED_STREAMS:
+                raise ValueError("Cannot remove primary streams!")
+            # Stop the stream if it's active
+            if STREAMS[stream_key]["active"]:
+                # Call stop_stream method
+                self.stop_stream(stream_key)
+            # Stop any standby encoders left for the stream
+            ENCODER_POOL.release(stream_key)
+            # Delete the stream from the dictionary
+            del STREAMS[stream_key]
+            # Log the removal
+            logger.info(f"Removed stream {stream_key}")
+
+    # Stop all active streams and all standby encoders
+    def stop_all(self):
+        for stream_key, stream in list(STREAMS.items()):
+            if stream["active"]:
+                self.stop_stream(stream_key)
+        ENCODER_POOL.release()
+
+    # Return a JSON-serializable description of a stream
+    def stream_status(self, stream_key):
+        # Get the stream dictionary
+        stream = STREAMS[stream_key]
+        # Copy the plain configuration and state fields
+        status = {key: value for key, value in stream.items() if isinstance(value, (str, int, float, bool, dict, list)) or value is None}
+        # Replace the process with its pid
+        status.pop("process", None)
+        status["pid"] = stream["process"].pid if stream.get("process") is not None else None
+        # Add the key
+        status["key"] = stream_key
+        # Return the description
+        return status
+
+# Define the HTTP handler of the headless JSON control API
+class ControlHandler(BaseHTTPRequestHandler):
+    # Engine controlled by the API
+    engine = None
+    # Metrics exporter also served on /metrics
+    exporter = None
+
+    # Send a JSON response
+    def send_json(self, status, body):
+        # Encode the body
+        data = json.dumps(body).encode()
+        # Send the response
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Read the JSON request body (empty object if there is none)
+    def read_json(self):
+        # Read the body
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length) if length else b""
+        # Parse it
+        return json.loads(data) if data else {}
+
+    # Split the request path into its decoded parts (e.g. ["streams", "radar", "start"])
+    def parts(self):
+        return [unquote(part) for part in urlsplit(self.path).path.split("/") if part]
+
+    # Refuse requests sent by web pages and control requests that are not JSON, returning True if refused
+    def refused(self, require_json=False):
+        # Browsers send an Origin header with cross-site requests, API clients do not
+        if self.headers.get("Origin") is not None:
+            self.send_json(403, {"error": "Requests from web pages are not accepted"})
+            return True
+        # Plain-text and form posts need no CORS preflight, so control requests must be JSON
+        if require_json and self.headers.get_content_type() != "application/json":
+            self.send_json(415, {"error": "Content-Type must be application/json"})
+            return True
+        return False
+
+    # Run a request and turn engine errors into JSON error responses
+    def handle_request(self, action):
+        try:
+            self.send_json(*action())
+        # Unknown stream
+        except KeyError as e:
+            self.send_json(404, {"error": f"Unknown stream {e}"})
+        # Invalid request (empty source or settings, unknown keys, existing stream, protected stream, bad JSON)
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+        # The stream cannot start (e.g. MediaMTX is not running)
+        except RuntimeError as e:
+            self.send_json(409, {"error": str(e)})
+
+    # Serve status requests: GET /streams, GET /streams/<key>, GET /health, GET /metrics
+    def do_GET(self):
+        # Refuse requests from web pages
+        if self.refused():
+            return
+        # Serve the Prometheus metrics
+        if self.parts() == ["metrics"]:
+            body = self.exporter.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        # Serve the stream status
+        def action():
+            parts = self.parts()
+            if parts == ["streams"]:
+                return 200, {"streams": [self.engine.stream_status(key) for key in list(STREAMS)]}
+            if len(parts) == 2 and parts[0] == "streams":
+                return 200, self.engine.stream_status(parts[1])
+            if parts == ["health"]:
+                return 200, {"rtsp_server": RTSP_HEALTH.server, **(RTSP_HEALTH.status(wait=True) or {})}
+            return 404, {"error": "Not found"}
+        self.handle_request(action)
+
+    # Serve control requests: POST /streams (add), POST /streams/<key>/start, POST /streams/<key>/stop
+    def do_POST(self):
+        # Refuse requests from web pages and requests that are not JSON
+        if self.refused(require_json=True):
+            return
+        def action():
+            parts = self.parts()
+            # Add a stream from {"source": ..., "width": ..., "height": ..., "fps": ..., ...}
+            if parts == ["streams"]:
+                options = self.read_json()
+                if not isinstance(options, dict):
+                    raise ValueError("The request body must be a JSON object")
+                # Only publish to MediaMTX or discard over the API (a file sink would let callers overwrite files)
+                if options.get("sink", "rtsp") not in API_SINKS:
+                    raise ValueError(f"sink must be one of {', '.join(API_SINKS)} over the API")
+                stream_key = self.engine.add_stream(options.pop("source", ""), **options)
+                return 201, self.engine.stream_status(stream_key)
+            # Start or stop a stream
+            if len(parts) == 3 and parts[0] == "streams" and parts[2] in ("start", "stop"):
+                if parts[2] == "start":
+                    self.engine.start_stream(parts[1])
+                else:
+                    self.engine.stop_stream(parts[1])
+                return 200, self.engine.stream_status(parts[1])
+            return 404, {"error": "Not found"}
+        self.handle_request(action)
+
+    # Serve remove requests: DELETE /streams/<key>
+    def do_DELETE(self):
+        # Refuse requests from web pages
+        if self.refused():
+            return
+        def action():
+            parts = self.parts()
+            if len(parts) == 2 and parts[0] == "streams":
+                self.engine.remove_stream(parts[1])
+                return 200, {"removed": parts[1]}
+            return 404, {"error": "Not found"}
+        self.handle_request(action)
+
+    # Keep requests out of the application log
+    def log_message(self, format, *args):
+        pass
+
+# Replace the configured streams with the ones in a JSON config file ({"streams": {key: {...}}})
+def load_streams(config_path):
+    # Read the config file
+    with open(config_path) as f:
+        config = json.load(f)
+    # Replace the built-in streams
+    STREAMS.clear()
+    # Add each configured stream with the default fields
+    for stream_key, stream in config.get("streams", {}).items():
+        STREAMS[stream_key] = dict({"active": False, "process": None, "status": "Inactive", "width": 0, "height": 0, "fps": 30, "lock_position": False}, **stream)
+    # Return the config
+    return config
+
+# Run the engine without the GUI, controlled over the local JSON API
+def run_headless(config_path, port=CONTROL_PORT, host=CONTROL_HOST):
+    # Log the start
+    logger.info(f"Starting streampulse v{__version__} (headless)")
+    # Load the streams from the config file
+    load_streams(config_path)
+    # Create the engine
+    engine = StreamEngine()
+    # Serve the control API (and /metrics) on its own threads
+    ControlHandler.engine = engine
+    ControlHandler.exporter = MetricsExporter()
+    server = ThreadingHTTPServer((host, port), ControlHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Control API listening on http://{host}:{server.server_address[1]}/streams")
+    # Wait for the first RTSP server probe, so autostarts see its result
+    RTSP_HEALTH.status(wait=True)
+    # Start the streams marked for autostart
+    for stream_key, stream in list(STREAMS.items()):
+        if stream.get("autostart"):
+            try:
+                engine.start_stream(stream_key)
+            # Log streams that cannot start
+            except RuntimeError as e:
+                logger.error(f"Cannot start {stream_key}: {str(e)}")
+    # Treat SIGTERM (service stop) like Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Wait until interrupted (stream failures are reported by the supervisor as they happen)
+    try:
+        while True:
+            time.sleep(60)
+    # Stop on Ctrl+C
+    except KeyboardInterrupt:
+        pass
+    # Stop the API and all streams
+    finally:
+        server.shutdown()
+        engine.stop_all()
+        logger.info("Headless engine stopped")
+
+# Define the table model of the streams, updated in place with only the cells that changed
+class StreamTableModel(QAbstractTableModel):
+    # Column headers
+    HEADERS = ["Stream", "Type", "Source", "Status", "Capture Active", "Start/Stop", "Remove", "Lock Position", "Metrics"]
+    # Column of the editable source
+    SOURCE_COLUMN = 2
+    # Column of the start/stop button
+    BUTTON_COLUMN = 5
+    # Column of the lock checkbox
+    LOCK_COLUMN = 7
+    # Emitted with the stream key after its source was edited
+    source_changed = pyqtSignal(str)
+
+    # Initialize the model with the current streams
+    def __init__(self, parent=None):
+        # Call the parent class initializer
+        super().__init__(parent)
+        # Stream key of each row
+        self.keys = list(STREAMS)
+        # Last reported cell values of each row, compared on refresh
+        self.snapshots = {stream_key: self.snapshot(stream_key) for stream_key in self.keys}
+
+    # Build the displayed values of a stream's row: (text, background color) per column
+    def snapshot(self, stream_key):
+        # Get the stream dictionary
+        stream = STREAMS[stream_key]
+        # Check if the stream is active
+        is_active = stream["active"]
+        # Determine if capture is active (process is running)
+        capture_active = bool(is_active and stream["process"] and stream["process"].poll() is None)
+        # Combine the feeder metrics with the encoder progress
+        progress = stream.get("progress") or {}
+        metrics = format_metrics(dict(stream.get("metrics") or {}, **progress))
+        # Return the row, highlighting encoders that fall behind real time
+        return (
+            (stream_key, None),
+            (stream["type"], None),
+            (stream.get("url", stream.get("name", "")), None),
+            (stream["status"], "lightgreen" if is_active else "lightcoral"),
+            ("", "green" if capture_active else "red"),
+            ("Stop" if is_active else "Start", None),
+            ("Remove", None),
+            (stream["lock_position"], None),
+            (metrics, "orange" if progress.get("alert") else None),
+        )
+
+    # Return the number of rows
+    def rowCount(self, parent=None):
+        return 0 if parent is not None and parent.isValid() else len(self.keys)
+
+    # Return the number of columns
+    def columnCount(self, parent=None):
+        return 0 if parent is not None and parent.isValid() else len(self.HEADERS)
+
+    # Return the column headers
+    def headerData(self, section, orientation, role=None):
+        # Default to the display role (resolved here, so the class can be defined without PyQt5)
+        role = Qt.DisplayRole if role is None else role
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    # Return the text, background color or check state of a cell
+    def data(self, index, role=None):
+        # Default to the display role (resolved here, so the class can be defined without PyQt5)
+        role = Qt.DisplayRole if role is None else role
+        # Get the cell value and color from the last snapshot
+        text, color = self.snapshots[self.keys[index.row()]][index.column()]
+        # The lock column is a checkbox
+        if index.column() == self.LOCK_COLUMN:
+            return (Qt.Checked if text else Qt.Unchecked) if role == Qt.CheckStateRole else None
+        # Return the text for display and editing
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return text
+        # Return the background color
+        if role == Qt.BackgroundRole and color:
+            return QColor(color)
+        return None
+
+    # Make the source editable and the lock checkable
+    def flags(self, index):
+        # Get the default flags
+        flags = super().flags(index)
+        if index.column() == self.SOURCE_COLUMN:
+            return flags | Qt.ItemIsEditable
+        if index.column() == self.LOCK_COLUMN:
+            return flags | Qt.ItemIsUserCheckable
+        return flags
+
+    # Apply an edited source or a toggled lock to the stream
+    def setData(self, index, value, role=None):
+        # Default to the edit role (resolved here, so the class can be defined without PyQt5)
+        role = Qt.EditRole if role is None else role
+        # Get the stream dictionary
+        stream_key = self.keys[index.row()]
+        stream = STREAMS.get(stream_key)
+        # Ignore edits of a stream that was removed meanwhile
+        if stream is None:
+            return False
+        # Update the lock position
+        if index.column() == self.LOCK_COLUMN and role == Qt.CheckStateRole:
+            stream["lock_position"] = value == Qt.Checked
+            logger.info(f"Lock position for {stream_key} set to {stream['lock_position']}")
+        # Update the URL or name based on stream type
+        elif index.column() == self.SOURCE_COLUMN and role == Qt.EditRole:
+            new_source = str(value).strip()
+            if stream["type"] == "youtube":
+                stream["url"] = new_source
+                logger.info(f"Updated {stream_key} URL to: {new_source}")
+            else:
+                stream["name"] = new_source
+                logger.info(f"Updated {stream_key} name to: {new_source}")
+            self.source_changed.emit(stream_key)
+        # Nothing else is editable
+        else:
+            return False
+        # Report the changed cell
+        self.refresh_row(index.row())
+        return True
+
+    # Report the cells of a row that changed since the last snapshot
+    def refresh_row(self, row):
+        # Take a new snapshot of the row
+        stream_key = self.keys[row]
+        previous = self.snapshots[stream_key]
+        current = self.snapshots[stream_key] = self.snapshot(stream_key)
+        # Emit dataChanged only for the cells that differ
+        for column, (old, new) in enumerate(zip(previous, current)):
+            if old != new:
+                self.dataChanged.emit(self.index(row, column), self.index(row, column))
+
+    # Bring the model in line with the streams: remove and add rows, then report the changed cells
+    def refresh(self):
+        # Remove the rows of removed streams, from the bottom up
+        for row in reversed(range(len(self.keys))):
+            if self.keys[row] not in STREAMS:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                self.snapshots.pop(self.keys.pop(row))
+                self.endRemoveRows()
+        # Append rows for new streams
+        new_keys = [stream_key for stream_key in list(STREAMS) if stream_key not in self.snapshots]
+        if new_keys:
+            self.beginInsertRows(QModelIndex(), len(self.keys), len(self.keys) + len(new_keys) - 1)
+            for stream_key in new_keys:
+                self.keys.append(stream_key)
+                self.snapshots[stream_key] = self.snapshot(stream_key)
+            self.endInsertRows()
+        # Report the changed cells of the other rows
+        for row in range(len(self.keys)):
+            self.refresh_row(row)
+
 # Define the main window class for the application
 class streampulseWindow(QMainWindow):
+    # Emitted from any thread with (stream key, event) when the engine reports a stream event, delivered on the GUI thread
+    stream_event = pyqtSignal(str, str)
+    # Emitted from the supervisor loop when the RTSP server comes up or goes down, delivered on the GUI thread
+    rtsp_changed = pyqtSignal()
+
     # Initialize the window
     def __init__(self):
         # Call the parent class (QMainWindow) initializer
@@ -165,21 +3555,26 @@ class streampulseWindow(QMainWindow):
         self.setWindowTitle(f"streampulse Stream Manager v{__version__}")
         # Set the window geometry (x, y, width, height)
         self.setGeometry(100, 100, 900, 600)
-        # Flag to track if table is being edited
-        self.editing = False
+        # Create the engine that runs the streams
+        self.engine = StreamEngine()
+        # Update the table as soon as a process exits, a stream restarts or fails (queued to the GUI thread)
+        self.stream_event.connect(self.on_stream_event)
+        self.engine.listeners.append(self.stream_event.emit)
         # Log the application start
         logger.info(f"Starting streampulse v{__version__}")
         # Try to initialize the UI and other components
         try:
             # Initialize the user interface
             self.init_ui()
-            # Check if MediaMTX is running
+            # Show the MediaMTX state now and whenever the background probe sees it change (never probing on this thread)
+            self.rtsp_changed.connect(self.check_mediamtx)
+            RTSP_HEALTH.listeners.append(lambda state: self.rtsp_changed.emit())
             self.check_mediamtx()
             # Create a timer to update status periodically
             self.status_timer = QTimer(self)
             # Connect the timer's timeout signal to update_status method
             self.status_timer.timeout.connect(self.update_status)
-            # Start the timer to trigger every 2000ms (2 seconds)
+            # Start the timer to trigger every 2000ms (2 seconds) to refresh the metrics (exits are signalled right away)
             self.status_timer.start(2000)
             # Create a lock for thread-safe status updates
             self.status_lock = threading.Lock()
@@ -206,25 +3601,29 @@ class streampulseWindow(QMainWindow):
             QPushButton { background-color: #4CAF50; color: white; border-radius: 5px; padding: 5px; }
             QPushButton:hover { background-color: #45a049; }
             QLineEdit { border: 1px solid #ccc; border-radius: 4px; padding: 3px; }
-            QTableWidget { border: 1px solid #ddd; background-color: white; }
+            QTableView { border: 1px solid #ddd; background-color: white; }
             QGroupBox { font-weight: bold; border: 1px solid #ccc; border-radius: 5px; padding: 10px; }
         """)
-        # Create a table widget for displaying streams
-        self.stream_table = QTableWidget(0, 8)
-        # Set the column headers for the table
-        self.stream_table.setHorizontalHeaderLabels(["Stream", "Type", "Source", "Status", "Capture Active", "Start/Stop", "Remove", "Lock Position"])
+        # Create the model of the streams
+        self.table_model = StreamTableModel(self)
+        # Create a table view for displaying streams
+        self.stream_table = QTableView()
+        self.stream_table.setModel(self.table_model)
         # Make the table columns stretch to fill the width
         self.stream_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Hide the row numbers
+        self.stream_table.verticalHeader().setVisible(False)
         # Set the font for the table
         self.stream_table.setFont(QFont("Arial", 10))
-        # Connect double-click event to start editing
-        self.stream_table.itemDoubleClicked.connect(self.start_editing)
-        # Connect item changed event to update stream source
-        self.stream_table.itemChanged.connect(self.update_stream_source)
+        # Create the buttons of new rows, and update the start/stop text when it changes
+        self.table_model.rowsInserted.connect(lambda parent, first, last: self.add_row_buttons(first, last))
+        self.table_model.dataChanged.connect(self.update_row_buttons)
+        # Show the status of edited sources
+        self.table_model.source_changed.connect(lambda stream_key: self.status_label.setText(f"Status: Updated {stream_key}"))
+        # Create the buttons of the initial rows
+        self.add_row_buttons(0, self.table_model.rowCount() - 1)
         # Add the table to the layout
         layout.addWidget(self.stream_table)
-        # Update the stream table with current data
-        self.update_stream_table()
         # Create a group box for stream configuration
         config_group = QGroupBox("Stream Configuration")
         # Create a form layout for the configuration group
@@ -279,145 +3678,79 @@ class streampulseWindow(QMainWindow):
         self.status_label.setStyleSheet("background-color: #e0e0e0; padding: 5px;")
         # Add the status label to the layout
         layout.addWidget(self.status_label)
+        # Create a label for the RTSP server health
+        self.rtsp_label = QLabel("RTSP server: checking")
+        # Set the style for the RTSP label
+        self.rtsp_label.setStyleSheet("background-color: #e0e0e0; padding: 5px;")
+        # Add the RTSP label to the layout
+        layout.addWidget(self.rtsp_label)
 
-    # Start editing a table item when double-clicked
-    def start_editing(self, item):
-        # Set editing flag to True
-        self.editing = True
-        # Begin editing the selected item
-        self.stream_table.editItem(item)
-
-    # Update the stream table with current stream data
-    def update_stream_table(self):
-        # Skip update if currently editing
-        if self.editing:
-            return
-        # Block signals to prevent unwanted updates
-        self.stream_table.blockSignals(True)
-        # Clear the table rows
-        self.stream_table.setRowCount(0)
-        # Iterate over each stream in the STREAMS dictionary
-        for stream_key, stream in STREAMS.items():
-            # Get the current row count
-            row = self.stream_table.rowCount()
-            # Insert a new row
-            self.stream_table.insertRow(row)
-            # Add the stream key to the first column
-            self.stream_table.setItem(row, 0, QTableWidgetItem(stream_key))
-            # Add the stream type to the second column
-            self.stream_table.setItem(row, 1, QTableWidgetItem(stream["type"]))
-            # Create an editable item for the source
-            source_item = QTableWidgetItem(stream.get("url", stream.get("name", "")))
-            # Make the source item editable
-            source_item.setFlags(source_item.flags() | Qt.ItemIsEditable)
-            # Add the source item to the third column
-            self.stream_table.setItem(row, 2, source_item)
-            # Create an item for the status
-            status_item = QTableWidgetItem(stream["status"])
-            # Check if the stream is active
-            is_active = stream["active"]
-            # Set the background color based on active status
-            status_item.setBackground(QColor("lightgreen" if is_active else "lightcoral"))
-            # Add the status item to the fourth column
-            self.stream_table.setItem(row, 3, status_item)
-            # Determine if capture is active (process is running)
-            capture_active = stream["active"] and stream["process"] and stream["process"].poll() is None
-            # Create an item for capture active status
-            capture_item = QTableWidgetItem("")
-            # Set the background color based on capture status
-            capture_item.setBackground(QColor("green" if capture_active else "red"))
-            # Add the capture item to the fifth column
-            self.stream_table.setItem(row, 4, capture_item)
+    # Create the start/stop and remove buttons of new rows (once per row, not on every refresh)
+    def add_row_buttons(self, first, last):
+        for row in range(first, last + 1):
+            # Get the stream key of the row
+            stream_key = self.table_model.keys[row]
             # Create a start/stop button
-            start_stop_btn = QPushButton("Stop" if stream["active"] else "Start")
+            start_stop_btn = QPushButton(self.table_model.index(row, StreamTableModel.BUTTON_COLUMN).data())
             # Connect the button click to toggle_stream with the stream key
             start_stop_btn.clicked.connect(lambda _, k=stream_key: self.toggle_stream(k))
             # Add the button to the sixth column
-            self.stream_table.setCellWidget(row, 5, start_stop_btn)
+            self.stream_table.setIndexWidget(self.table_model.index(row, StreamTableModel.BUTTON_COLUMN), start_stop_btn)
             # Create a remove button
             remove_btn = QPushButton("Remove")
             # Connect the button click to remove_stream with the stream key
             remove_btn.clicked.connect(lambda _, k=stream_key: self.remove_stream(k))
             # Disable the button for protected streams
-            remove_btn.setEnabled(stream_key not in ["radar", "mystream2", "fallback"])
+            remove_btn.setEnabled(stream_key not in PROTECTED_STREAMS)
             # Add the remove button to the seventh column
-            self.stream_table.setCellWidget(row, 6, remove_btn)
-            # Create a checkbox for locking position
-            lock_checkbox = QCheckBox()
-            # Set the checkbox state based on lock_position
-            lock_checkbox.setChecked(stream["lock_position"])
-            # Connect the checkbox state change to toggle_lock
-            lock_checkbox.stateChanged.connect(lambda state, k=stream_key: self.toggle_lock(k, state))
-            # Add the checkbox to the eighth column
-            self.stream_table.setCellWidget(row, 7, lock_checkbox)
-        # Re-enable signals after updating
-        self.stream_table.blockSignals(False)
-
-    # Toggle the lock position for a stream
-    def toggle_lock(self, stream_key, state):
-        # Update the lock_position value in the STREAMS dictionary
-        STREAMS[stream_key]["lock_position"] = bool(state)
-        # Log the change
-        logger.info(f"Lock position for {stream_key} set to {bool(state)}")
-
-    # Update the stream source when edited in the table
-    def update_stream_source(self, item):
-        # Try to update the stream source
-        try:
-            # Get the row of the edited item
-            row = item.row()
-            # Get the stream key from the first column
-            stream_key = self.stream_table.item(row, 0).text()
-            # Get the new source text
-            new_source = item.text().strip()
-            # Check if the stream key exists
-            if stream_key not in STREAMS:
-                # Raise an error if the stream is not found
-                raise KeyError(f"Stream '{stream_key}' not found")
-            # Get the stream dictionary
-            stream = STREAMS[stream_key]
-            # Update the URL or name based on stream type
-            if stream["type"] == "youtube":
-                # Update the URL for YouTube streams
-                stream["url"] = new_source
-                # Log the update
-                logger.info(f"Updated {stream_key} URL to: {new_source}")
-            else:
-                # Update the name for window streams
-                stream["name"] = new_source
-                # Log the update
-                logger.info(f"Updated {stream_key} name to: {new_source}")
-            # Update the status label
-            self.status_label.setText(f"Status: Updated {stream_key}")
-        # Handle any exceptions during update
-        except Exception as e:
-            # Log the error with stack trace
-            logger.error(f"Error updating {stream_key}: {str(e)}\n{traceback.format_exc()}")
-            # Show a warning message box
-            QMessageBox.warning(self, "Error", f"Failed to update stream: {e}")
-        # Reset editing flag and update table
-        finally:
-            # Set editing flag to False
-            self.editing = False
-            # Refresh the stream table
-            self.update_stream_table()
+            self.stream_table.setIndexWidget(self.table_model.index(row, StreamTableModel.BUTTON_COLUMN + 1), remove_btn)
+
+    # Update the start/stop button text when the model reports a change of that cell
+    def update_row_buttons(self, top_left, bottom_right):
+        # Ignore changes outside the button column
+        if not top_left.column() <= StreamTableModel.BUTTON_COLUMN <= bottom_right.column():
+            return
+        # Update the button of each changed row
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            index = self.table_model.index(row, StreamTableModel.BUTTON_COLUMN)
+            button = self.stream_table.indexWidget(index)
+            if button is not None:
+                button.setText(index.data())
+
+    # Update the stream table with current stream data (only changed cells are repainted)
+    def update_stream_table(self):
+        self.table_model.refresh()
 
-    # Check if MediaMTX is running
+    # Show whether MediaMTX is running, from the cached health probe
     def check_mediamtx(self):
-        # Check if any process named 'mediamtx.exe' is running
-        mediamtx_running = any(proc.info['name'].lower() == 'mediamtx.exe' for proc in psutil.process_iter(['pid', 'name']))
-        # Update status if MediaMTX is not running
-        if not mediamtx_running:
+        # Get the cached probe result
+        state = RTSP_HEALTH.status()
+        # Update status while the first probe is pending
+        if state is None:
+            # Set the status label
+            self.status_label.setText("Status: Checking MediaMTX")
+        # Update status if MediaMTX is not answering
+        elif not state["up"]:
             # Set the status label
             self.status_label.setText("Status: MediaMTX not running. Start it manually or via batch file with admin rights.")
-            # Log a warning
-            logger.warning("MediaMTX not detected")
-        # Update status if MediaMTX is running
+        # Update status if MediaMTX is answering
         else:
             # Set the status label
             self.status_label.setText("Status: MediaMTX detected")
-            # Log the detection
-            logger.info("MediaMTX detected")
+        # Show the probe result
+        self.update_rtsp_label()
+
+    # Show the cached health and latency of the RTSP server
+    def update_rtsp_label(self):
+        # Get the cached probe result
+        state = RTSP_HEALTH.status()
+        # Show the latency, the error, or that the first probe is pending
+        if state is None:
+            self.rtsp_label.setText(f"RTSP server {RTSP_HEALTH.server}: checking")
+        elif state["up"]:
+            self.rtsp_label.setText(f"RTSP server {RTSP_HEALTH.server}: up, {state['latency_ms']} ms")
+        else:
+            self.rtsp_label.setText(f"RTSP server {RTSP_HEALTH.server}: down ({state['error']})")
 
     # Toggle a stream on or off
     def toggle_stream(self, stream_key):
@@ -436,412 +3769,78 @@ class streampulseWindow(QMainWindow):
 
     # Start a stream
     def start_stream(self, stream_key):
-        # Check if MediaMTX is running
-        mediamtx_running = any(proc.info['name'].lower() == 'mediamtx.exe' for proc in psutil.process_iter(['pid', 'name']))
-        # Warn if MediaMTX is not running
-        if not mediamtx_running:
+        # Start the stream in the engine
+        try:
+            self.engine.start_stream(stream_key)
+        # Warn if it cannot start (e.g. MediaMTX is not running)
+        except RuntimeError as e:
             # Show a warning message box
-            QMessageBox.warning(self, "Warning", "MediaMTX is not running. Start it manually or via batch file with admin rights.")
+            QMessageBox.warning(self, "Warning", str(e))
             # Exit the method
             return
-        # Get the stream dictionary
-        stream = STREAMS[stream_key]
-        # Start window capture if type is window
-        if stream["type"] == "window":
-            # Call start_window_capture with stream parameters
-            self.start_window_capture(stream_key, stream["name"], stream["width"], stream["height"], stream["fps"])
-        # Start YouTube stream if type is youtube
-        elif stream["type"] == "youtube":
-            # Call start_youtube_stream with stream parameters
-            self.start_youtube_stream(stream_key, stream["url"], stream["width"], stream["height"], stream["fps"])
-        # Mark the stream as active
-        stream["active"] = True
-        # Update the stream status
-        stream["status"] = "Streaming"
         # Update the status label
         self.status_label.setText(f"Status: Started {stream_key}")
-        # Log the stream start
-        logger.info(f"Started stream {stream_key} at rtsp://{RTSP_SERVER}/{stream_key}")
-
-    # Define a method to log FFmpeg output
-    def log_ffmpeg_output(self, ffmpeg_process, stream_key):
-        # Read lines from FFmpeg stderr
-        for line in iter(ffmpeg_process.stderr.readline, b''):
-            # Check if the line contains an error
-            if "error" in line.decode().lower():
-                # Log the error
-                logger.error(f"FFmpeg error for {stream_key}: {line.decode().strip()}")
-
-    # Start capturing a window stream
-    def start_window_capture(self, stream_key, window_name, width, height, fps):
-        # Define a function to feed frames to FFmpeg
-        def feed_frames(camera, ffmpeg_process, stream_key, fps, captured_width, captured_height):
-            # Initialize frame counter
-            frame_count = 0
-            # Record the last logging time
-            last_log_time = time.time()
-            # Continue while stream is active and capture is running
-            while STREAMS[stream_key]["active"] and camera.is_capturing and ffmpeg_process.poll() is None:
-                # Get the latest frame from the camera
-                frame = camera.get_latest_frame()
-                # Process the frame if it exists
-                if frame is not None:
-                    # Try to feed the frame to FFmpeg
-                    try:
-                        # Convert frame to bytes
-                        buffer = frame.tobytes()
-                        # Write the buffer to FFmpeg stdin
-                        ffmpeg_process.stdin.write(buffer)
-                        # Flush the stdin buffer
-                        ffmpeg_process.stdin.flush()
-                        # Increment the frame counter
-                        frame_count += 1
-                        # Log every 5 seconds
-                        if time.time() - last_log_time >= 5:
-                            # Log the frame count and buffer size
-                            logger.info(f"Streaming {stream_key}: frame {frame_count}, size: {len(buffer)} bytes")
-                            # Update the last log time
-                            last_log_time = time.time()
-                    # Handle any exceptions during frame feeding
-                    except Exception as e:
-                        # Log the error
-                        logger.error(f"Error feeding frame for {stream_key}: {str(e)}")
-                        # Break the loop
-                        break
-                # Sleep to maintain the target FPS
-                time.sleep(1 / fps)
-
-        # Define a function to monitor the window and stream
-        def monitor_and_stream():
-            # Initialize camera and FFmpeg process variables
-            camera = None
-            ffmpeg_process = None
-            current_output_idx = None
-            initial_region = None
-            captured_width = None
-            captured_height = None
-            last_restart_time = 0
-            last_window_pos = None
-            debounce_delay = 0.5  # Delay to prevent rapid restarts
-            # Log the start of window capture
-            logger.info(f"Starting window capture for {stream_key}: {window_name}")
-            # Continue while the stream is active
-            while STREAMS[stream_key]["active"]:
-                # Try to monitor and stream
-                try:
-                    # Find the window by name
-                    window = next((w for w in gw.getAllWindows() if window_name.lower() in w.title.lower()), None)
-                    # Check if the window was found
-                    if not window:
-                        # Log a warning if window not found
-                        logger.warning(f"Window '{window_name}' not found. Retrying...")
-                        # Wait before retrying
-                        time.sleep(1)
-                        # Skip to next iteration
-                        continue
-                    # Get window position and size
-                    rx, ry, r_width, r_height = window.left, window.top, window.width, window.height
-                    rx_adjusted = rx + 24  # Adjust x position
-                    ry_adjusted = ry       # No adjustment for y
-                    # Get list of monitors
-                    monitors = get_monitors()
-                    target_monitor_idx = 0  # Default monitor index
-                    # Find the monitor containing the window
-                    for i, monitor in enumerate(monitors):
-                        if (monitor.x <= rx_adjusted < monitor.x + monitor.width and
-                            monitor.y <= ry_adjusted < monitor.y + monitor.height):
-                            target_monitor_idx = i
-                            break
-                    # Get the target monitor
-                    monitor = monitors[target_monitor_idx]
-                    # Calculate capture region within monitor bounds
-                    region_left = max(rx_adjusted, monitor.x)
-                    region_top = max(ry_adjusted, monitor.y)
-                    region_right = min(region_left + r_width, monitor.x + monitor.width)
-                    region_bottom = min(region_top + r_height, monitor.y + monitor.height)
-                    # Calculate captured dimensions
-                    new_captured_width = region_right - region_left
-                    new_captured_height = region_bottom - region_top
-                    # Define the capture region relative to monitor
-                    region = (region_left - monitor.x, region_top - monitor.y, 
-                             region_right - monitor.x, region_bottom - monitor.y)
-                    # Set the output index
-                    output_idx = target_monitor_idx
-                    # Use specified width/height or captured dimensions
-                    output_width = width if width > 0 else new_captured_width
-                    output_height = height if height > 0 else new_captured_height
-                    # Ensure even dimensions for FFmpeg
-                    if output_width % 2 != 0:
-                        output_width -= 1
-                    if output_height % 2 != 0:
-                        output_height -= 1
-                    # Record current window position
-                    current_window_pos = (rx, ry, r_width, r_height)
-                    # Check conditions for restarting capture
-                    size_changed = new_captured_width != captured_width or new_captured_height != captured_height
-                    monitor_changed = current_output_idx != output_idx
-                    region_changed = not STREAMS[stream_key]["lock_position"] and region != initial_region
-                    pos_changed = current_window_pos != last_window_pos and not STREAMS[stream_key]["lock_position"]
-                    should_restart = (size_changed or monitor_changed or region_changed or pos_changed) and (time.time() - last_restart_time > debounce_delay)
-                    # Log debug info if DEBUG_MODE is enabled
-                    if DEBUG_MODE:
-                        logger.debug(f"Window {window_name} pos: {current_window_pos}, region: {region}")
-                    # Restart camera if needed
-                    if camera is None or monitor_changed or (region_changed and not size_changed):
-                        if camera:
-                            # Stop the existing camera
-                            camera.stop()
-                            logger.info(f"Stopped previous DXCamera on output {current_output_idx}")
-                        # Create a new DXCamera instance
-                        camera = dxcam.create(device_idx=0, output_idx=output_idx)
-                        if camera is None:
-                            # Fallback to output 0 if creation fails
-                            logger.error(f"DXCamera failed on output {output_idx}, falling back to 0")
-                            camera = dxcam.create(device_idx=0, output_idx=0)
-                            output_idx = 0
-                        # Start the camera with specified settings
-                        camera.start(target_fps=fps, region=region, video_mode=True)
-                        logger.info(f"Started DXCamera for {stream_key} on output {output_idx} with region {region}")
-                        # Set the initial region
-                        initial_region = region
-                        # Update the current output index
-                        current_output_idx = output_idx
-                    # Restart FFmpeg if needed
-                    if ffmpeg_process is None or should_restart:
-                        if ffmpeg_process:
-                            # Terminate the existing FFmpeg process
-                            ffmpeg_process.terminate()
-                            logger.info(f"Terminated FFmpeg due to change")
-                        # Define video filters for FFmpeg
-                        vf_filters = [f"scale={output_width}:{output_height}", "format=rgb24,format=yuv420p"]
-                        if width > 0 and height > 0:
-                            vf_filters = [
-                                f"scale={output_width}:{output_height}:force_original_aspect_ratio=decrease",
-                                f"pad={output_width}:{output_height}:(ow-iw)/2:(oh-ih)/2",
-                                "format=rgb24,format=yuv420p"
-                            ]
-                        # Define the FFmpeg command
-                        cmd = [
-                            FFMPEG_PATH, "-f", "rawvideo", "-pixel_format", "rgb24",
-                            "-video_size", f"{new_captured_width}x{new_captured_height}", "-framerate", str(fps),
-                            "-i", "pipe:0", "-fflags", "nobuffer", "-c:v", "libx264", "-preset", "ultrafast",
-                            "-tune", "zerolatency", "-vf", ",".join(vf_filters), "-an", "-f", "rtsp",
-                            "-rtsp_transport", "tcp", f"rtsp://{RTSP_SERVER}/{stream_key}"
-                        ]
-                        # Start the FFmpeg process
-                        ffmpeg_process = subprocess.Popen(
-                            cmd,
-                            stdin=subprocess.PIPE,
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE,  # Use PIPE for stderr
-                            creationflags=subprocess.CREATE_NO_WINDOW
-                        )
-                        # Store the process in the STREAMS dictionary
-                        STREAMS[stream_key]["process"] = ffmpeg_process
-                        # Start a thread to log FFmpeg output using class method
-                        threading.Thread(target=self.log_ffmpeg_output, args=(ffmpeg_process, stream_key), daemon=True).start()
-                        # Start a thread to feed frames to FFmpeg
-                        threading.Thread(target=feed_frames, args=(camera, ffmpeg_process, stream_key, fps, new_captured_width, new_captured_height), daemon=True).start()
-                        # Log the FFmpeg start
-                        logger.info(f"Started FFmpeg for {stream_key} with region {region}, size {new_captured_width}x{new_captured_height}")
-                        # Update captured dimensions
-                        captured_width = new_captured_width
-                        captured_height = new_captured_height
-                        # Update the last restart time
-                        last_restart_time = time.time()
-                        # Update the last window position
-                        last_window_pos = current_window_pos
-                        # Update the initial region
-                        initial_region = region
-                    # Wait before the next check
-                    time.sleep(0.5)
-                # Handle exceptions in monitoring
-                except Exception as e:
-                    # Log the error
-                    logger.error(f"Error in window capture for {stream_key}: {str(e)}")
-                    # Break the loop
-                    break
-            # Clean up camera if it exists
-            if camera:
-                # Stop the camera
-                camera.stop()
-                # Log the stop
-                logger.info(f"Stopped DXCamera for {stream_key}")
-            # Clean up FFmpeg if it exists
-            if ffmpeg_process:
-                # Terminate the FFmpeg process
-                ffmpeg_process.terminate()
-                # Log the stop
-                logger.info(f"Stopped FFmpeg for {stream_key}")
-
-        # Start the monitoring thread
-        threading.Thread(target=monitor_and_stream, daemon=True).start()
-
-    # Start streaming a YouTube video
-    def start_youtube_stream(self, stream_key, url, width, height, fps):
-        # Define a function to handle YouTube streaming
-        def stream_youtube():
-            # Set maximum retry attempts
-            max_retries = 3
-            # Set delay between retries
-            retry_delay = 2
-            # Initialize attempt counter
-            attempt = 0
-            # Log the start attempt
-            logger.info(f"Starting YouTube stream {stream_key}: {url}")
-            # Continue while active and retries remain
-            while attempt < max_retries and STREAMS[stream_key]["active"]:
-                # Try to start the stream
-                try:
-                    # Command to get the HLS URL from yt-dlp
-                    ytdlp_cmd = [YTDLP_PATH, "-f", "bestvideo", "--get-url", url]
-                    # Execute yt-dlp and get the URL
-                    m3u8_url = subprocess.check_output(ytdlp_cmd, text=True, stderr=subprocess.STDOUT).strip()
-                    # Check if URL is empty
-                    if not m3u8_url:
-                        # Raise an error if no URL is returned
-                        raise ValueError("yt-dlp returned empty URL")
-                    # Define the FFmpeg command
-                    cmd = [
-                        FFMPEG_PATH, "-re", "-i", m3u8_url,
-                        "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
-                        "-r", str(fps),
-                    ]
-                    # Add scaling filter if width/height specified
-                    if width > 0 and height > 0:
-                        cmd.extend(["-vf", f"scale={width}:{height},format=yuv420p"])
-                    else:
-                        cmd.extend(["-vf", "format=yuv420p"])
-                    # Add output options
-                    cmd.extend(["-an", "-rtsp_transport", "tcp", "-f", "rtsp", f"rtsp://{RTSP_SERVER}/{stream_key}"])
-                    # Start the FFmpeg process
-                    process = subprocess.Popen(cmd, stderr=subprocess.PIPE, creationflags=subprocess.CREATE_NO_WINDOW)
-                    # Store the process in the STREAMS dictionary
-                    STREAMS[stream_key]["process"] = process
-                    # Start a thread to log FFmpeg output using class method
-                    threading.Thread(target=self.log_ffmpeg_output, args=(process, stream_key), daemon=True).start()
-                    # Wait for the process to complete
-                    process.wait()
-                    # Check the return code
-                    if process.returncode != 0 and STREAMS[stream_key]["active"]:
-                        # Log a warning if failed
-                        logger.warning(f"Stream {stream_key} failed, retrying ({attempt + 1}/{max_retries})")
-                        # Increment attempt counter
-                        attempt += 1
-                        # Wait before retrying
-                        time.sleep(retry_delay)
-                    else:
-                        # Break if successful or stopped
-                        break
-                # Handle exceptions during streaming
-                except Exception as e:
-                    # Log the error
-                    logger.error(f"Error starting YouTube stream {stream_key}: {str(e)}")
-                    # Break the loop
-                    break
-
-        # Start the YouTube streaming thread
-        threading.Thread(target=stream_youtube, daemon=True).start()
 
     # Stop a stream
     def stop_stream(self, stream_key):
-        # Get the stream dictionary
-        stream = STREAMS[stream_key]
-        # Terminate the process if it exists
-        if stream["process"]:
-            # Terminate the FFmpeg process
-            stream["process"].terminate()
-            # Clear the process reference
-            stream["process"] = None
-        # Mark the stream as inactive
-        stream["active"] = False
-        # Update the stream status
-        stream["status"] = "Inactive"
+        # Stop the stream in the engine
+        self.engine.stop_stream(stream_key)
         # Update the status label
         self.status_label.setText(f"Status: Stopped {stream_key}")
-        # Log the stop
-        logger.info(f"Stopped stream {stream_key}")
 
     # Add a new stream
     def add_stream(self):
-        # Get the source text from the input
-        source = self.source_input.text().strip()
-        # Check if source is empty
-        if not source:
-            # Show a warning if no source provided
-            QMessageBox.warning(self, "Warning", "Please enter a source!")
-            # Exit the method
-            return
-        # Determine the stream key from the source
-        stream_key = source.split("/")[-1] if source.startswith("http") else source
-        # Check if stream key already exists
-        if stream_key in STREAMS:
-            # Show a warning if stream exists
-            QMessageBox.warning(self, "Warning", "Stream already exists!")
+        # Add the stream from the source input and settings
+        try:
+            stream_key = self.engine.add_stream(
+                self.source_input.text(), self.width_spin.value(), self.height_spin.value(),
+                self.fps_spin.value(), self.lock_checkbox.isChecked()
+            )
+        # Warn if the source is empty or the stream exists
+        except ValueError as e:
+            # Show a warning message box
+            QMessageBox.warning(self, "Warning", str(e))
             # Exit the method
             return
-        # Add a YouTube stream if source is a URL
-        if source.startswith("http"):
-            STREAMS[stream_key] = {
-                "type": "youtube", "url": source, "active": False, "process": None,
-                "status": "Inactive", "width": self.width_spin.value(),
-                "height": self.height_spin.value(), "fps": self.fps_spin.value(),
-                "lock_position": False
-            }
-        # Add a window stream otherwise
-        else:
-            STREAMS[stream_key] = {
-                "type": "window", "name": source, "active": False, "process": None,
-                "status": "Inactive", "width": self.width_spin.value(),
-                "height": self.height_spin.value(), "fps": self.fps_spin.value(),
-                "lock_position": self.lock_checkbox.isChecked()
-            }
         # Update the stream table
         self.update_stream_table()
         # Update the status label
         self.status_label.setText(f"Status: Added {stream_key}")
-        # Log the addition
-        logger.info(f"Added stream {stream_key}")
 
     # Remove a stream
     def remove_stream(self, stream_key):
-        # Check if stream is protected
-        if stream_key in ["radar", "mystream2", "fallback"]:
-            # Show a warning if trying to remove a protected stream
-            QMessageBox.warning(self, "Warning", "Cannot remove primary streams!")
+        # Remove the stream in the engine
+        try:
+            self.engine.remove_stream(stream_key)
+        # Warn if trying to remove a protected stream
+        except ValueError as e:
+            # Show a warning message box
+            QMessageBox.warning(self, "Warning", str(e))
             # Exit the method
             return
-        # Stop the stream if it's active
-        if STREAMS[stream_key]["active"]:
-            # Call stop_stream method
-            self.stop_stream(stream_key)
-        # Delete the stream from the dictionary
-        del STREAMS[stream_key]
         # Update the stream table
         self.update_stream_table()
         # Update the status label
         self.status_label.setText(f"Status: Removed {stream_key}")
-        # Log the removal
-        logger.info(f"Removed stream {stream_key}")
 
     # Update the status of all streams
     def update_status(self):
         # Acquire the status lock for thread safety
         with self.status_lock:
-            # Iterate over all streams
-            for stream_key, stream in STREAMS.items():
-                # Check if stream failed
-                if stream["active"] and stream["process"] and stream["process"].poll() is not None:
-                    # Mark stream as inactive
-                    stream["active"] = False
-                    # Clear the process reference
-                    stream["process"] = None
-                    # Update the status to failed
-                    stream["status"] = "Failed"
-                    # Log the failure
-                    logger.warning(f"Stream {stream_key} failed")
             # Update the stream table
             self.update_stream_table()
+            # Update the RTSP server health
+            self.update_rtsp_label()
+
+    # Show a stream event reported by the engine
+    def on_stream_event(self, stream_key, event):
+        # Update the changed cells
+        self.update_stream_table()
+        # Show the exit code and the last stderr line
+        last_exit = STREAMS.get(stream_key, {}).get("last_exit") or {}
+        detail = f" (exit code {last_exit.get('code')}: {(last_exit.get('stderr') or ['no output'])[-1]})" if last_exit else ""
+        # Update the status label
+        self.status_label.setText(f"Status: {stream_key} {event}{detail}")
 
     # Handle window close event
     def closeEvent(self, event):
@@ -850,6 +3849,8 @@ class streampulseWindow(QMainWindow):
             if stream["active"] and stream["process"]:
                 # Terminate the FFmpeg process
                 stream["process"].terminate()
+        # Stop the standby encoders
+        ENCODER_POOL.release()
         # Kill any lingering FFmpeg processes
         for proc in psutil.process_iter(['pid', 'name']):
             try:
@@ -868,12 +3869,24 @@ class streampulseWindow(QMainWindow):
 
 # Main entry point of the application
 if __name__ == "__main__":
+    # Read the headless mode options (other arguments are left to Qt)
+    parser = argparse.ArgumentParser(description="StreamPulse stream manager")
+    parser.add_argument("--headless", metavar="CONFIG", help="Run without the GUI, loading streams from a JSON config file")
+    parser.add_argument("--port", type=int, default=CONTROL_PORT, help="Port of the headless control API")
+    args, _ = parser.parse_known_args()
+    # Run the headless daemon
+    if args.headless:
+        run_headless(args.headless, args.port)
+        sys.exit(0)
     # Try to start the application
     try:
         # Create the Qt application
         app = QApplication(sys.argv)
         # Create the main window
         window = streampulseWindow()
+        # Start the metrics endpoint if a port is configured
+        if METRICS_PORT:
+            start_metrics_server()
         # Show the window
         window.show()
         # Execute the application event loop
@@ -0,0 +1,140 @@
+# Import socket for the stub RTSP listener
+import socket
+# Import threading to serve the stub on its own thread
+import threading
+# Import time to measure the cached lookups and wait for probes
+import time
+# Import unittest to run the checks (python -m unittest test_rtsp_health)
+import unittest
+# Import the application module
+import streampulse as sp
+
+# Define a stub RTSP server that answers every request with a configurable status line
+class StubRtspServer:
+    # Start listening on a local port (a free one by default)
+    def __init__(self, status_line=b"RTSP/1.0 200 OK", port=0):
+        # Status line sent back to each request
+        self.status_line = status_line
+        # Number of requests answered
+        self.requests = 0
+        # Listen on the port, which can be reused right after a previous stub on it was closed
+        self.socket = socket.socket()
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(("127.0.0.1", port))
+        self.socket.listen()
+        # Address in the "host:port" form of RTSP_SERVER
+        self.address = f"127.0.0.1:{self.socket.getsockname()[1]}"
+        # Serve on a daemon thread
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    # Answer each connection with the status line
+    def serve(self):
+        while True:
+            try:
+                connection, _ = self.socket.accept()
+            # The stub was closed
+            except OSError:
+                return
+            with connection:
+                connection.recv(1024)
+                self.requests += 1
+                connection.sendall(self.status_line + b"\r\nCSeq: 1\r\n\r\n")
+
+    # Stop listening
+    def close(self):
+        self.socket.close()
+
+# Return a local address nothing listens on
+def closed_address():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{probe.getsockname()[1]}"
+
+# Check the background RTSP health prober against the stub
+class RtspHealthProberTest(unittest.TestCase):
+    # Create a prober for an address with short intervals
+    def prober(self, address):
+        prober = sp.RtspHealthProber(address, interval=0.2, timeout=1, retry_interval=0.1)
+        self.addCleanup(lambda: prober.future and prober.future.cancel())
+        return prober
+
+    # A 200 answer is up, with a latency
+    def test_up(self):
+        server = StubRtspServer()
+        self.addCleanup(server.close)
+        state = self.prober(server.address).status(wait=True)
+        self.assertTrue(state["up"])
+        self.assertEqual(state["code"], 200)
+        self.assertGreater(state["latency_ms"], 0)
+
+    # Any RTSP answer means the server is up, even 401 with authentication on
+    def test_unauthorized_is_up(self):
+        server = StubRtspServer(b"RTSP/1.0 401 Unauthorized")
+        self.addCleanup(server.close)
+        state = self.prober(server.address).status(wait=True)
+        self.assertTrue(state["up"])
+        self.assertEqual(state["code"], 401)
+
+    # A server that does not speak RTSP is down
+    def test_not_rtsp_is_down(self):
+        server = StubRtspServer(b"HTTP/1.1 200 OK")
+        self.addCleanup(server.close)
+        state = self.prober(server.address).status(wait=True)
+        self.assertFalse(state["up"])
+        self.assertEqual(state["error"], "not an RTSP answer")
+
+    # A refused connection is down, and ready() answers from the cache without probing
+    def test_ready_reads_the_cache(self):
+        prober = self.prober(closed_address())
+        self.assertFalse(prober.status(wait=True)["up"])
+        started = time.perf_counter()
+        for _ in range(1000):
+            self.assertFalse(prober.ready())
+        self.assertLess(time.perf_counter() - started, 0.1)
+
+    # The server is seen within the retry interval once it starts listening
+    def test_server_coming_up(self):
+        server = StubRtspServer()
+        self.addCleanup(server.close)
+        port = server.socket.getsockname()[1]
+        server.close()
+        prober = self.prober(server.address)
+        self.assertFalse(prober.status(wait=True)["up"])
+        server = StubRtspServer(port=port)
+        self.addCleanup(server.close)
+        deadline = time.monotonic() + 2
+        while not prober.ready() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertTrue(prober.ready())
+
+    # Listeners are told when the state changes
+    def test_listeners(self):
+        server = StubRtspServer()
+        self.addCleanup(server.close)
+        prober = self.prober(server.address)
+        changes = []
+        prober.listeners.append(lambda state: changes.append(state["up"]))
+        prober.status(wait=True)
+        server.status_line = b"garbage"
+        deadline = time.monotonic() + 2
+        while len(changes) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(changes, [True, False])
+
+    # Stream starts that publish over RTSP are refused from the cached state
+    def test_start_refused_when_down(self):
+        prober = self.prober(closed_address())
+        prober.status(wait=True)
+        original = sp.RTSP_HEALTH
+        sp.RTSP_HEALTH = prober
+        self.addCleanup(setattr, sp, "RTSP_HEALTH", original)
+        sp.STREAMS["probe_test"] = {"type": "youtube", "url": "https://example.invalid", "active": False, "process": None,
+                                    "status": "Inactive", "width": 0, "height": 0, "fps": 30, "lock_position": False}
+        self.addCleanup(sp.STREAMS.pop, "probe_test", None)
+        with self.assertRaises(RuntimeError):
+            sp.StreamEngine().start_stream("probe_test")
+        self.assertFalse(sp.STREAMS["probe_test"]["active"])
+
+# Run the tests
+if __name__ == "__main__":
+    unittest.main()